@@ -1,21 +1,33 @@
 #!/usr/bin/env python3
 
 import argparse
+import atexit
+import base64
+import hashlib
 import json
+import math
 import os
 import random
+import re
+import runpy
 import secrets
+import shutil
+import signal
+import socket
 import string
 import subprocess
+import sys
+import tempfile
 import time
 import traceback
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from datetime import datetime
 from enum import Enum
+from functools import partial
 from pathlib import Path
-from threading import Lock, current_thread
-from typing import List, Tuple
+from threading import Event, Lock, Thread, current_thread
+from typing import Callable, Dict, List, Optional, Tuple
 
 import yaml
 from dockerfile_parse import DockerfileParser
@@ -26,6 +38,43 @@ CHECKERS_PATH = BASE_DIR / "checkers"
 MAX_THREADS = int(os.getenv("MAX_THREADS", default=2 * os.cpu_count()))
 RUNS = int(os.getenv("RUNS", default=10))
 HOST = os.getenv("HOST", default="127.0.0.1")
+REPORT_PATH = Path(os.getenv("REPORT_PATH", default="check-report.json"))
+# Actions are flagged once their p99 duration comes within this fraction of the checker timeout.
+TIMEOUT_MARGIN = float(os.getenv("TIMEOUT_MARGIN", default=0.2))
+ACTIONS = ["INFO", "CHECK", "PUT", "GET"]
+# "process" starts each checker action as a new process,
+# while "fork" forks it from a warm process which has already imported the checker.
+CHECKER_MODE = os.getenv("CHECKER_MODE", default="process")
+# Rounds per second started against each service by the load subcommand,
+# each for the next simulated team in turn.
+LOAD_RATE = float(os.getenv("LOAD_RATE", default=1))
+LOAD_DURATION = float(os.getenv("LOAD_DURATION", default=300))
+LOAD_INTERVAL = float(os.getenv("LOAD_INTERVAL", default=10))
+LOAD_REPORT_PATH = Path(os.getenv("LOAD_REPORT_PATH", default="load-report.json"))
+TEAMS = int(os.getenv("TEAMS", default=10))
+# Results of the structure validation are reused for unchanged files, unless set to an empty string.
+VALIDATE_CACHE_PATH = os.getenv(
+    "VALIDATE_CACHE_PATH", default=str(BASE_DIR / ".validate-cache.json")
+)
+STATUSES = {
+    101: "OK",
+    102: "CORRUPT",
+    103: "MUMBLE",
+    104: "DOWN",
+    110: "ERROR",
+    124: "TIMEOUT",
+}
+MEMORY_UNITS = {
+    "B": 1,
+    "kB": 10**3,
+    "KiB": 2**10,
+    "MB": 10**6,
+    "MiB": 2**20,
+    "GB": 10**9,
+    "GiB": 2**30,
+    "TB": 10**12,
+    "TiB": 2**40,
+}
 OUT_LOCK = Lock()
 DISABLE_LOG = False
 
@@ -102,6 +151,64 @@ def generate_flag(name):
     return name[0].upper() + "".join(random.choices(alph, k=30)) + "="
 
 
+def percentile(values: List[float], q: float) -> float:
+    # Nearest-rank percentile of the sorted values.
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class ActionTimings:
+    def __init__(self):
+        self._lock = Lock()
+        self._durations: Dict[Tuple[str, str, Optional[int]], List[float]] = (
+            defaultdict(list)
+        )
+
+    def record(self, service: str, action: str, vuln: Optional[int], elapsed: float):
+        with self._lock:
+            self._durations[(service, action, vuln)].append(elapsed)
+
+    def report(self, timeouts: Dict[str, int]) -> List[dict]:
+        """
+        Returns duration percentiles and a histogram in tenths of the checker timeout
+        for each action of each service and vuln.
+        """
+
+        with self._lock:
+            durations = {key: sorted(d) for key, d in self._durations.items()}
+
+        result = []
+        for (service, action, vuln), values in sorted(
+            durations.items(),
+            key=lambda item: (item[0][0], ACTIONS.index(item[0][1]), item[0][2] or 0),
+        ):
+            timeout = timeouts[service]
+            histogram = [0] * 11
+            for value in values:
+                histogram[min(10, int(10 * value / timeout))] += 1
+
+            p99 = percentile(values, 0.99)
+            result.append(
+                {
+                    "service": service,
+                    "action": action,
+                    "vuln": vuln,
+                    "timeout": timeout,
+                    "count": len(values),
+                    "p50": percentile(values, 0.5),
+                    "p90": percentile(values, 0.9),
+                    "p99": p99,
+                    "max": values[-1],
+                    "histogram": histogram,
+                    "near_timeout": p99 >= (1 - TIMEOUT_MARGIN) * timeout,
+                }
+            )
+
+        return result
+
+
+TIMINGS = ActionTimings()
+
+
 def colored_log(*messages, color: ColorType = ColorType.INFO):
     ts = datetime.utcnow().isoformat(sep=" ", timespec="milliseconds")
     print(
@@ -138,6 +245,190 @@ class BaseValidator:
         return not cond
 
 
+class CheckerZygote:
+    """
+    Warm process which imports the checker once, without running its main block,
+    and then forks a child running the checker as __main__ for each action.
+    Actions thus keep the stdout/stderr/returncode contract of the checker process,
+    without paying for interpreter startup and imports every time.
+    """
+
+    def __init__(self, exe_path: Path):
+        self._socket_path = Path(tempfile.mkdtemp(prefix="checker-")) / "zygote.sock"
+        # Written to a file, since nothing reads the output of the zygote once it's ready.
+        self._stderr = (self._socket_path.parent / "zygote.err").open("w+b")
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import sys; sys.path.insert(0, sys.argv[1]); import check; check.run_checker_zygote(*sys.argv[2:])",
+                str(BASE_DIR),
+                str(exe_path),
+                str(self._socket_path),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+        atexit.register(self.close)
+
+        if self._process.stdout.readline() != b"ready\n":
+            self._process.wait()
+            self._stderr.seek(0)
+            raise RuntimeError(self._stderr.read().decode())
+
+    def run(self, command: List[str], env, timeout: int) -> Tuple[int, bytes, bytes]:
+        """
+        Returns the return code, stdout and stderr of the action, with 124 returned on timeout like timeout does.
+        """
+
+        deadline = time.monotonic() + timeout
+        pid = None
+
+        def remaining() -> float:
+            # Zero would switch the socket to the non-blocking mode instead of timing out right away.
+            return max(deadline - time.monotonic(), 1e-3)
+
+        # The connection, the fork and the action itself all count towards the timeout.
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                while True:
+                    conn.settimeout(remaining())
+                    try:
+                        conn.connect(str(self._socket_path))
+                        break
+                    except BlockingIOError:
+                        # The accept backlog of the zygote is full.
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError("checker zygote is busy")
+                        time.sleep(0.05)
+
+                stream = conn.makefile("rwb")
+                stream.write(json.dumps({"argv": command, "env": dict(env)}).encode())
+                stream.write(b"\n")
+                stream.flush()
+
+                pid = self._receive(stream, "forking the action")["pid"]
+                conn.settimeout(remaining())
+                result = self._receive(stream, "returning the action result")
+        except TimeoutError:
+            if pid is not None:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            return 124, b"", b""
+
+        return (
+            result["returncode"],
+            base64.b64decode(result["stdout"]),
+            base64.b64decode(result["stderr"]),
+        )
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+        self._stderr.close()
+        shutil.rmtree(self._socket_path.parent, ignore_errors=True)
+
+    def _receive(self, stream, stage: str) -> dict:
+        line = stream.readline()
+        if not line:
+            status = self._process.poll()
+            raise RuntimeError(
+                f"checker zygote closed the connection before {stage}"
+                + (f", zygote exited with code {status}" if status is not None else "")
+            )
+
+        return json.loads(line)
+
+
+def run_checker_zygote(exe_path: str, socket_path: str):
+    """
+    Serve actions of the checker for CheckerZygote, forking a child for each of them.
+    Exits once the process which has started it exits.
+    """
+
+    sys.path.insert(0, str(Path(exe_path).parent))
+    runpy.run_path(exe_path, run_name="__checker__")
+
+    # Children are never waited for, and are reaped automatically.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    parent = os.getppid()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(socket_path)
+        listener.listen(128)
+        listener.settimeout(1)
+        print("ready", flush=True)
+
+        while os.getppid() == parent:
+            try:
+                conn, _ = listener.accept()
+            except TimeoutError:
+                continue
+
+            if os.fork() == 0:
+                listener.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                run_forked_action(conn, exe_path)
+
+            conn.close()
+
+
+def run_forked_action(conn: socket.socket, exe_path: str):
+    stream = conn.makefile("rwb")
+    request = json.loads(stream.readline())
+    stream.write(json.dumps({"pid": os.getpid()}).encode() + b"\n")
+    stream.flush()
+
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = request["argv"]
+    # The random module is reseeded on fork by itself, unlike numpy.
+    if "numpy" in sys.modules:
+        sys.modules["numpy"].random.seed()
+
+    out, err = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    os.dup2(out.fileno(), sys.stdout.fileno())
+    os.dup2(err.fileno(), sys.stderr.fileno())
+
+    # Exit codes are converted to the return code the same way the interpreter does.
+    try:
+        runpy.run_path(exe_path, run_name="__main__")
+        returncode = 0
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code & 0xFF
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    out.seek(0)
+    err.seek(0)
+
+    stream.write(
+        json.dumps(
+            {
+                "returncode": returncode,
+                "stdout": base64.b64encode(out.read()).decode(),
+                "stderr": base64.b64encode(err.read()).decode(),
+            }
+        ).encode()
+        + b"\n"
+    )
+    stream.flush()
+    os._exit(0)
+
+
 class Checker(BaseValidator):
     def __init__(self, name: str):
         self._name = name
@@ -147,6 +438,12 @@ class Checker(BaseValidator):
             f"{self._exe_path.relative_to(BASE_DIR)} must be executable",
         )
         self._timeout = 3
+        self._zygote = None
+        if CHECKER_MODE == "fork":
+            try:
+                self._zygote = CheckerZygote(self._exe_path)
+            except RuntimeError as e:
+                self._fatal(False, f"failed to start warm checker process:\n{e}")
         self._get_info()
 
     def _get_info(self):
@@ -173,8 +470,13 @@ class Checker(BaseValidator):
             "attack_data": self._attack_data,
         }
 
-    def _run_command(self, command: List[str], env=None) -> Tuple[str, str]:
-        action = command[1].upper()
+    def _execute(
+        self, command: List[str], env=None, vuln: Optional[int] = None
+    ) -> Tuple[int, bytes, bytes, float]:
+        """
+        Run the action, recording its duration in TIMINGS.
+        """
+
         cmd = ["timeout", str(self._timeout)] + command
 
         if env is None:
@@ -183,11 +485,24 @@ class Checker(BaseValidator):
         env["PWNLIB_NOTERM"] = "1"
 
         start = time.monotonic()
-        p = subprocess.run(cmd, capture_output=True, check=False, env=env)
+        if self._zygote is not None:
+            returncode, stdout, stderr = self._zygote.run(command, env, self._timeout)
+        else:
+            p = subprocess.run(cmd, capture_output=True, check=False, env=env)
+            returncode, stdout, stderr = p.returncode, p.stdout, p.stderr
+
         elapsed = time.monotonic() - start
+        TIMINGS.record(self._name, command[1].upper(), vuln, elapsed)
+        return returncode, stdout, stderr, elapsed
 
-        out = p.stdout.decode()
-        err = p.stderr.decode()
+    def _run_command(
+        self, command: List[str], env=None, vuln: Optional[int] = None
+    ) -> Tuple[str, str]:
+        action = command[1].upper()
+        returncode, stdout, stderr, elapsed = self._execute(command, env, vuln)
+
+        out = stdout.decode()
+        err = stderr.decode()
 
         out_s = out.rstrip("\n")
         err_s = err.rstrip("\n")
@@ -196,11 +511,11 @@ class Checker(BaseValidator):
             f"action: {action}\ntime: {elapsed:.2f}s\nstdout:\n{out_s}\nstderr:\n{err_s}"
         )
         self._fatal(
-            p.returncode != 124,
+            returncode != 124,
             f"action {action}: bad return code: 124, probably {ColorType.BOLD}timeout{ColorType.ENDC}",
         )
         self._fatal(
-            p.returncode == 101, f"action {action}: bad return code: {p.returncode}"
+            returncode == 101, f"action {action}: bad return code: {returncode}"
         )
         return out, err
 
@@ -212,7 +527,7 @@ class Checker(BaseValidator):
     def put(self, flag: str, flag_id: str, vuln: int):
         self._log(f"running PUT, flag={flag} flag_id={flag_id} vuln={vuln}")
         cmd = [str(self._exe_path), "put", HOST, flag_id, flag, str(vuln)]
-        out, err = self._run_command(cmd)
+        out, err = self._run_command(cmd, vuln=vuln)
 
         self._fatal(len(out) <= 1024, "returned stdout is longer than 1024 characters")
         self._fatal(len(err) <= 1024, "returned stderr is longer than 1024 characters")
@@ -234,17 +549,62 @@ class Checker(BaseValidator):
     def get(self, flag: str, flag_id: str, vuln: int):
         self._log(f"running GET, flag={flag} flag_id={flag_id} vuln={vuln}")
         cmd = [str(self._exe_path), "get", HOST, flag_id, flag, str(vuln)]
-        self._run_command(cmd)
+        self._run_command(cmd, vuln=vuln)
+
+    def run_vuln(self, vuln: int):
+        flag = generate_flag(self._name)
+        flag_id = self.put(flag=flag, flag_id=secrets.token_hex(16), vuln=vuln)
+        flag_id = flag_id.strip()
+        self.get(flag, flag_id, vuln)
 
     def run_all(self, step: int):
-        self._log(f"running all actions (run {step} of {RUNS})")
-        self.check()
+        for task in self.run_tasks(step):
+            task()
+
+    def run_tasks(self, step: int) -> List[Callable[[], None]]:
+        # Actions of a single run, which don't depend on each other:
+        # the check and the put/get chain of each vuln.
+        def check():
+            self._log(f"running all actions (run {step} of {RUNS})")
+            self.check()
+
+        return [check] + [
+            partial(self.run_vuln, vuln) for vuln in range(1, self._vulns + 1)
+        ]
+
+    def load_round(self, flags: "FlagStore", record: Callable[[str, int, float], None]):
+        """
+        Run a single round of a team without failing on errors: the check,
+        then for each vuln a put of a new flag and a get of a random flag put by the team so far.
+        Flags put successfully are added to flags, and each action is passed to record.
+        """
+
+        returncode, _, _, elapsed = self._execute([str(self._exe_path), "check", HOST])
+        record("CHECK", returncode, elapsed)
 
         for vuln in range(1, self._vulns + 1):
             flag = generate_flag(self._name)
-            flag_id = self.put(flag=flag, flag_id=secrets.token_hex(16), vuln=vuln)
-            flag_id = flag_id.strip()
-            self.get(flag, flag_id, vuln)
+            flag_id = secrets.token_hex(16)
+            returncode, out, err, elapsed = self._execute(
+                [str(self._exe_path), "put", HOST, flag_id, flag, str(vuln)],
+                vuln=vuln,
+            )
+            record("PUT", returncode, elapsed)
+
+            if returncode == 101:
+                flag_id = (err if self._attack_data else out).decode().strip()
+                flags.add(vuln, flag, flag_id)
+
+            put = flags.choice(vuln)
+            if put is None:
+                continue
+
+            flag, flag_id = put
+            returncode, _, _, elapsed = self._execute(
+                [str(self._exe_path), "get", HOST, flag_id, flag, str(vuln)],
+                vuln=vuln,
+            )
+            record("GET", returncode, elapsed)
 
     def __str__(self):
         return f"checker {self._name}"
@@ -287,32 +647,148 @@ class Service(BaseValidator):
         self._run_dc("down", "-v")
 
     def validate_checker(self):
-        self._log("validating checker")
+        run_checkers([self])
+
+    def checker_tasks(self, step: int) -> List[Callable[[], None]]:
+        return self._checker.run_tasks(step)
+
+    def load_round(self, flags: "FlagStore", record: Callable[[str, int, float], None]):
+        self._checker.load_round(flags, record)
+
+    def containers(self) -> List[str]:
+        """
+        Returns IDs of the running containers of the service.
+        """
 
-        cnt_threads = max(1, min(MAX_THREADS, RUNS // 10))
-        self._log(f"starting {cnt_threads} checker threads")
-        with ThreadPoolExecutor(
-            max_workers=cnt_threads,
-            thread_name_prefix="Executor",
-        ) as executor:
-            for _ in executor.map(self._checker.run_all, range(1, RUNS + 1)):
-                pass
+        cmd = ["docker", "compose", "-f", str(self._dc_path), "ps", "-q"]
+        p = subprocess.run(cmd, capture_output=True, check=True)
+        return p.stdout.decode().split()
 
     def __str__(self):
         return f"service {self._name}"
 
 
+class ValidationCache:
+    """
+    Results of validating files, persisted between runs along with content hashes of the files.
+    A result is reused while the content of the file, and of the files read while validating it, is the same,
+    with hashes themselves reused while the file modification time and size are the same.
+    Results are dropped altogether once the validation rules in this script change.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = Lock()
+        self._version = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+        self._hashes: Dict[str, dict] = {}
+        self._results: Dict[str, dict] = {}
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") == self._version:
+            self._hashes = data["hashes"]
+            self._results = data["results"]
+
+    def digest(self, f: Path) -> Optional[str]:
+        """
+        Returns SHA-256 of the file content, or None if it can't be read.
+        """
+
+        key = os.path.relpath(f, BASE_DIR)
+        try:
+            stat = f.stat()
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._hashes.get(key)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            return entry["sha256"]
+
+        try:
+            digest = hashlib.sha256(f.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        with self._lock:
+            self._hashes[key] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+            }
+        return digest
+
+    def get(self, f: Path) -> Optional[List[Tuple[str, str]]]:
+        """
+        Returns the messages reported while validating the file, if they can be reused.
+        """
+
+        with self._lock:
+            result = self._results.get(os.path.relpath(f, BASE_DIR))
+        if result is None or result["sha256"] != self.digest(f):
+            return None
+
+        for dependency, digest in result["dependencies"].items():
+            if self.digest(BASE_DIR / dependency) != digest:
+                return None
+
+        return [(kind, message) for kind, message in result["messages"]]
+
+    def put(self, f: Path, dependencies: List[Path], messages: List[Tuple[str, str]]):
+        result = {
+            "sha256": self.digest(f),
+            "dependencies": {
+                os.path.relpath(d, BASE_DIR): self.digest(d) for d in dependencies
+            },
+            "messages": list(messages),
+        }
+        with self._lock:
+            self._results[os.path.relpath(f, BASE_DIR)] = result
+
+    def save(self):
+        with self._lock:
+            data = {
+                "version": self._version,
+                "hashes": self._hashes,
+                "results": self._results,
+            }
+
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, self._path)
+
+
 class StructureValidator(BaseValidator):
-    def __init__(self, d: Path, service: Service):
+    def __init__(
+        self, d: Path, service: Service, cache: Optional[ValidationCache] = None
+    ):
         self._dir = d
         self._was_error = False
         self._service = service
+        self._cache = cache
+        # Messages reported while validating the current file, and the other files read for it, to be cached.
+        self._messages: List[Tuple[str, str]] = []
+        self._dependencies: List[Path] = []
 
     def _error(self, cond, message):
         err = super()._error(cond, message)
         self._was_error |= err
+        if err:
+            self._messages.append(("error", message))
         return err
 
+    def _warning(self, cond: bool, message: str) -> bool:
+        warn = super()._warning(cond, message)
+        if warn:
+            self._messages.append(("warning", message))
+        return warn
+
     def validate(self):
         for d in VALIDATE_DIRS:
             self.validate_dir(self._dir / d / self._service.name)
@@ -328,6 +804,24 @@ class StructureValidator(BaseValidator):
                 self.validate_dir(f)
 
     def validate_file(self, f: Path):
+        if self._cache is not None:
+            messages = self._cache.get(f)
+            if messages is not None:
+                for kind, message in messages:
+                    if kind == "error":
+                        self._error(False, message)
+                    else:
+                        self._warning(False, message)
+                return
+
+        self._messages = []
+        self._dependencies = []
+        self._validate_file(f)
+
+        if self._cache is not None:
+            self._cache.put(f, self._dependencies, self._messages)
+
+    def _validate_file(self, f: Path):
         path = f.relative_to(BASE_DIR)
 
         if f.name not in ALLOWED_YAML_FILES:
@@ -436,6 +930,7 @@ class StructureValidator(BaseValidator):
                         else:
                             dockerfile = f.parent / context / "Dockerfile"
 
+                    self._dependencies.append(dockerfile)
                     if self._error(
                         dockerfile.exists(), f"no dockerfile found in {dockerfile}"
                     ):
@@ -514,19 +1009,74 @@ class StructureValidator(BaseValidator):
 
 def get_services() -> List[Service]:
     if os.getenv("SERVICE") in ["all", None]:
-        result = list(
-            Service(service_path.name)
+        names = [
+            service_path.name
             for service_path in SERVICES_PATH.iterdir()
             if service_path.name[0] != "." and service_path.is_dir()
-        )
+        ]
     else:
-        result = [Service(os.environ["SERVICE"])]
+        names = [os.environ["SERVICE"]]
+
+    # Checkers are asked for their info concurrently.
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(MAX_THREADS, len(names))),
+        thread_name_prefix="Executor",
+    ) as executor:
+        result = list(executor.map(Service, names))
 
     with OUT_LOCK:
         colored_log("Got services:", ", ".join(map(str, result)))
     return result
 
 
+def run_checkers(services: List[Service]):
+    """
+    Run the checkers of all services concurrently, within the MAX_THREADS budget.
+    Each run of each checker is split into its independent tasks, and runs of different services are interleaved,
+    so validating all services takes about as long as the slowest one.
+    Once any task fails, the remaining ones are skipped.
+    """
+
+    for service in services:
+        service._log("validating checker")
+
+    tasks = [
+        task
+        for step in range(1, RUNS + 1)
+        for service in services
+        for task in service.checker_tasks(step)
+    ]
+    failed = Event()
+
+    def run(task: Callable[[], None]):
+        if failed.is_set() or DISABLE_LOG:
+            return
+
+        try:
+            task()
+        except BaseException:
+            failed.set()
+            raise
+
+    cnt_threads = max(1, min(MAX_THREADS, len(tasks)))
+    with OUT_LOCK:
+        colored_log(f"starting {cnt_threads} checker threads for {len(tasks)} tasks")
+
+    with ThreadPoolExecutor(
+        max_workers=cnt_threads,
+        thread_name_prefix="Executor",
+    ) as executor:
+        futures = [executor.submit(run, task) for task in tasks]
+        wait(futures, return_when=FIRST_EXCEPTION)
+
+        for future in futures:
+            future.cancel()
+
+    for future in futures:
+        if not future.cancelled():
+            future.result()
+
+
 def list_services(_args):
     services = get_services()
     if outfile := os.getenv("GITHUB_OUTPUT"):
@@ -553,18 +1103,345 @@ def logs_services(_args):
 
 
 def validate_checkers(_args):
-    for service in get_services():
-        service.validate_checker()
+    services = get_services()
+    try:
+        run_checkers(services)
+    finally:
+        report_timings(services)
+
+
+def report_timings(services: List[Service]):
+    """
+    Print duration percentiles of the checker actions, flagging the ones close to the timeout,
+    and write them to the JSON report.
+    """
+
+    report = TIMINGS.report(
+        {service.name: service.checker_info["timeout"] for service in services}
+    )
+
+    with OUT_LOCK:
+        for entry in report:
+            action = entry["action"]
+            if entry["vuln"] is not None:
+                action += f" vuln {entry['vuln']}"
+
+            colored_log(
+                f"service {entry['service']}: {action}: count={entry['count']} "
+                f"p50={entry['p50']:.2f}s p90={entry['p90']:.2f}s "
+                f"p99={entry['p99']:.2f}s max={entry['max']:.2f}s",
+                color=ColorType.WARNING if entry["near_timeout"] else ColorType.INFO,
+            )
+            if entry["near_timeout"]:
+                colored_log(
+                    f"service {entry['service']}: {action}: p99 is within "
+                    f"{TIMEOUT_MARGIN:.0%} of the {entry['timeout']}s timeout",
+                    color=ColorType.WARNING,
+                )
+
+        with REPORT_PATH.open("w") as f:
+            json.dump(
+                {"timeout_margin": TIMEOUT_MARGIN, "actions": report}, f, indent=2
+            )
+        colored_log(f"Timings report written to {REPORT_PATH}")
+
+
+class FlagStore:
+    """
+    Flags put by a team to a service, by vuln, shared by the concurrent rounds of the team.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._flags: Dict[int, List[Tuple[str, str]]] = defaultdict(list)
+
+    def add(self, vuln: int, flag: str, flag_id: str):
+        with self._lock:
+            self._flags[vuln].append((flag, flag_id))
+
+    def choice(self, vuln: int) -> Optional[Tuple[str, str]]:
+        """
+        Returns a random flag and its ID put to the vuln so far, if any.
+        """
+
+        with self._lock:
+            flags = self._flags[vuln]
+            return random.choice(flags) if flags else None
+
+
+class LoadStats:
+    """
+    Actions and container samples recorded during the load, summarized over intervals of the elapsed time.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._start = time.monotonic()
+        self._actions: List[Tuple[float, str, str, str, float]] = []
+        self._containers: List[Tuple[float, str, str, float, int]] = []
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def record(self, service: str, action: str, returncode: int, elapsed: float):
+        status = STATUSES.get(returncode, f"RC{returncode}")
+        with self._lock:
+            self._actions.append((self.elapsed(), service, action, status, elapsed))
+
+    def record_container(
+        self, at: float, service: str, container: str, cpu: float, memory: int
+    ):
+        with self._lock:
+            self._containers.append((at, service, container, cpu, memory))
+
+    def summary(self, start: float, end: float) -> dict:
+        """
+        Returns throughput, statuses and duration percentiles of the actions of each service,
+        along with CPU and memory usage of its containers, for actions finished within [start, end).
+        """
+
+        with self._lock:
+            actions = [a for a in self._actions if start <= a[0] < end]
+            containers = [c for c in self._containers if start <= c[0] < end]
+
+        services: Dict[str, dict] = defaultdict(
+            lambda: {"throughput": 0.0, "actions": {}, "containers": {}}
+        )
+
+        grouped: Dict[Tuple[str, str], List[Tuple[str, float]]] = defaultdict(list)
+        for _, service, action, status, elapsed in actions:
+            grouped[(service, action)].append((status, elapsed))
+
+        for (service, action), results in sorted(
+            grouped.items(), key=lambda item: (item[0][0], ACTIONS.index(item[0][1]))
+        ):
+            durations = sorted(elapsed for _, elapsed in results)
+            services[service]["throughput"] += len(results) / (end - start)
+            services[service]["actions"][action] = {
+                "count": len(results),
+                "statuses": dict(Counter(status for status, _ in results)),
+                "p50": percentile(durations, 0.5),
+                "p90": percentile(durations, 0.9),
+                "p99": percentile(durations, 0.99),
+                "max": durations[-1],
+            }
+
+        for _, service, container, cpu, memory in containers:
+            sample = services[service]["containers"].setdefault(
+                container, {"cpu": 0.0, "memory": 0}
+            )
+            sample["cpu"] = max(sample["cpu"], cpu)
+            sample["memory"] = max(sample["memory"], memory)
+
+        return {"start": start, "end": end, "services": dict(services)}
+
+
+def parse_memory(usage: str) -> int:
+    # Used memory of the "1.5GiB / 2GiB" usage reported by docker stats.
+    match = re.fullmatch(r"([\d.]+)\s*([A-Za-z]+)", usage.split("/")[0].strip())
+    if match is None or match.group(2) not in MEMORY_UNITS:
+        return 0
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2)])
+
+
+def sample_containers(services: List[Service], stats: LoadStats, at: float) -> bool:
+    """
+    Record CPU and memory usage of the service containers using docker stats, as sampled at the specified time.
+    Returns false if docker isn't available.
+    """
+
+    try:
+        containers = {
+            container: service.name
+            for service in services
+            for container in service.containers()
+        }
+        if not containers:
+            return True
+
+        p = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{json .}}"]
+            + list(containers),
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+    for line in p.stdout.decode().splitlines():
+        sample = json.loads(line)
+        service = next(
+            (
+                name
+                for container, name in containers.items()
+                if container.startswith(sample["ID"])
+            ),
+            None,
+        )
+        if service is None:
+            continue
+
+        stats.record_container(
+            at,
+            service,
+            sample["Name"],
+            float(sample["CPUPerc"].rstrip("%") or 0),
+            parse_memory(sample["MemUsage"]),
+        )
+
+    return True
+
+
+def log_load_summary(summary: dict):
+    with OUT_LOCK:
+        for service, service_summary in sorted(summary["services"].items()):
+            actions = ", ".join(
+                f"{action} {a['count']} "
+                f"({' '.join(f'{s}={n}' for s, n in sorted(a['statuses'].items()))}) "
+                f"p50={a['p50']:.2f}s p99={a['p99']:.2f}s"
+                for action, a in service_summary["actions"].items()
+            )
+            containers = ", ".join(
+                f"{name} cpu={c['cpu']:.1f}% mem={c['memory'] / 2**20:.1f}MiB"
+                for name, c in sorted(service_summary["containers"].items())
+            )
+
+            failed = any(
+                status != "OK"
+                for a in service_summary["actions"].values()
+                for status in a["statuses"]
+            )
+            colored_log(
+                "; ".join(
+                    part
+                    for part in [
+                        f"service {service} [{summary['start']:.0f}s-{summary['end']:.0f}s]: "
+                        f"{service_summary['throughput']:.2f} actions/s",
+                        actions,
+                        containers,
+                    ]
+                    if part
+                ),
+                color=ColorType.WARNING if failed else ColorType.INFO,
+            )
+
+
+def run_load(_args):
+    """
+    Drive rounds of check/put/get against the services at LOAD_RATE rounds per second for LOAD_DURATION seconds,
+    reporting throughput, statuses, latency and container usage every LOAD_INTERVAL seconds.
+    Rounds which can't be started within MAX_THREADS are queued, and the queued ones are dropped at the end.
+    Action duration percentiles are reported in the end, the same way as for check.
+    """
+
+    services = get_services()
+    stats = LoadStats()
+    # Flags put by each simulated team to each service.
+    flags = [{service.name: FlagStore() for service in services} for _ in range(TEAMS)]
+    summaries = []
+    done = Event()
+
+    def reporter():
+        sampling = True
+        interval = 0
+        while not done.wait(max(0.0, (interval + 1) * LOAD_INTERVAL - stats.elapsed())):
+            # Containers are sampled at the end of the interval, as its usage.
+            start = interval * LOAD_INTERVAL
+            if sampling and not sample_containers(services, stats, start):
+                sampling = False
+                with OUT_LOCK:
+                    colored_log(
+                        "docker stats are unavailable, not sampling containers",
+                        color=ColorType.WARNING,
+                    )
+
+            summary = stats.summary(start, start + LOAD_INTERVAL)
+            summaries.append(summary)
+            log_load_summary(summary)
+            interval += 1
+
+    with OUT_LOCK:
+        colored_log(
+            f"starting load of {LOAD_RATE} rounds/s per service "
+            f"for {TEAMS} teams during {LOAD_DURATION:.0f}s on {MAX_THREADS} threads"
+        )
+
+    reporter_thread = Thread(target=reporter, name="Reporter", daemon=True)
+    reporter_thread.start()
+
+    rounds = 0
+    with ThreadPoolExecutor(
+        max_workers=MAX_THREADS, thread_name_prefix="Load"
+    ) as executor:
+        futures = []
+        while stats.elapsed() < LOAD_DURATION:
+            team = rounds % TEAMS
+            for service in services:
+                futures.append(
+                    executor.submit(
+                        service.load_round,
+                        flags[team][service.name],
+                        partial(stats.record, service.name),
+                    )
+                )
+
+            rounds += 1
+            time.sleep(max(0.0, rounds / LOAD_RATE - stats.elapsed()))
+
+        dropped = sum(future.cancel() for future in futures)
+
+    done.set()
+    reporter_thread.join()
+
+    with OUT_LOCK:
+        colored_log(
+            f"finished load: {rounds} rounds per service started, {dropped} rounds dropped",
+            color=ColorType.WARNING if dropped else ColorType.INFO,
+        )
+
+    total = stats.summary(0, stats.elapsed())
+    log_load_summary(total)
+
+    with LOAD_REPORT_PATH.open("w") as f:
+        json.dump(
+            {
+                "rate": LOAD_RATE,
+                "duration": LOAD_DURATION,
+                "teams": TEAMS,
+                "threads": MAX_THREADS,
+                "rounds": rounds,
+                "dropped": dropped,
+                "total": total,
+                "intervals": summaries,
+            },
+            f,
+            indent=2,
+        )
+    with OUT_LOCK:
+        colored_log(f"Load report written to {LOAD_REPORT_PATH}")
+
+    report_timings(services)
 
 
 def validate_structure(_args):
-    was_error = False
-    for service in get_services():
-        validator = StructureValidator(BASE_DIR, service)
-        if not validator.validate():
-            was_error = True
+    services = get_services()
+    cache = ValidationCache(Path(VALIDATE_CACHE_PATH)) if VALIDATE_CACHE_PATH else None
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(MAX_THREADS, len(services))),
+        thread_name_prefix="Validator",
+    ) as executor:
+        results = list(
+            executor.map(
+                lambda service: StructureValidator(BASE_DIR, service, cache).validate(),
+                services,
+            )
+        )
 
-    if was_error:
+    if cache is not None:
+        cache.save()
+
+    if not all(results):
         with OUT_LOCK:
             colored_log("Structure validator: failed", color=ColorType.FAIL)
             raise AssertionError
@@ -596,7 +1473,11 @@ def dump_tasks(_args):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Validate checkers for A&D. "
-        "Host & number of runs are passed with HOST and RUNS env vars"
+        "Host & number of runs are passed with HOST and RUNS env vars, "
+        "path of the timings report and the fraction of timeout to flag slow actions within "
+        "with REPORT_PATH and TIMEOUT_MARGIN env vars. "
+        "Set CHECKER_MODE=fork to run checker actions forked from warm pre-imported processes. "
+        "Structure validation results are cached in VALIDATE_CACHE_PATH, set it to an empty string to disable"
     )
     subparsers = parser.add_subparsers()
 
@@ -630,6 +1511,13 @@ if __name__ == "__main__":
     )
     check_parser.set_defaults(func=validate_checkers)
 
+    load_parser = subparsers.add_parser(
+        "load",
+        help="Run sustained load on services, "
+        "configured with LOAD_RATE, LOAD_DURATION, LOAD_INTERVAL and TEAMS env vars",
+    )
+    load_parser.set_defaults(func=run_load)
+
     validate_parser = subparsers.add_parser(
         "validate",
         help="Run structure validation",
@@ -0,0 +1,91 @@
+import argparse
+import statistics
+import threading
+import time
+from typing import cast
+
+import rpyc
+
+from conveyor import GoldConveyorService
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.connections",
+        description="Load-test connection handling of a running conveyor server. "
+        "Run it against servers started with different CONVEYOR_SERVER_MODE values to compare them.",
+    )
+    argument_parser.add_argument(
+        "host", help="Conveyor service connection target host.", type=str
+    )
+    argument_parser.add_argument(
+        "port", help="Conveyor service connection target port.", type=int
+    )
+    argument_parser.add_argument(
+        "--clients", help="Number of concurrent clients.", type=int, default=200
+    )
+    argument_parser.add_argument(
+        "--duration", help="Test duration in seconds.", type=float, default=30
+    )
+    argument_parser.add_argument(
+        "--samples", help="Samples generated per connection.", type=int, default=50
+    )
+
+    args = argument_parser.parse_args()
+    deadline = time.monotonic() + args.duration
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = 0
+
+    def client():
+        nonlocal errors
+
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                session(args.host, args.port, args.samples)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+
+            with lock:
+                latencies.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    print(f"connections: {len(latencies)} ok, {errors} failed in {elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:.1f} connections/s")
+    if len(latencies) >= 2:
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"latency: p50 {quantiles[49] * 1000:.1f}ms, p90 {quantiles[89] * 1000:.1f}ms, "
+            f"p99 {quantiles[98] * 1000:.1f}ms, max {max(latencies) * 1000:.1f}ms"
+        )
+
+
+def session(host: str, port: int, samples: int):
+    conn: rpyc.Connection = rpyc.connect(
+        host=host,
+        port=port,
+        config=dict(include_local_traceback=False, include_local_version=False),
+    )
+
+    try:
+        service = cast(GoldConveyorService, conn.root)
+        df = service.data_conveyor.random_alloy_samples(
+            weight_ozt=1, max_deviation=0.01, samples=samples
+        )
+        len(df)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
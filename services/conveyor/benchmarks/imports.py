@@ -0,0 +1,85 @@
+import argparse
+import subprocess
+import sys
+
+DEFAULT_STATEMENTS = [
+    "import conveyor",
+    "from conveyor import AlloyComposition",
+    "import scripts.client",
+    "from conveyor import GoldConveyorService",
+]
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.imports",
+        description="Measure import time of the conveyor package using python -X importtime. "
+        "Exits with a non-zero code if any of the statements exceeds its budget.",
+    )
+    argument_parser.add_argument(
+        "statements",
+        help="Import statements to measure, each in a fresh interpreter.",
+        nargs="*",
+        default=DEFAULT_STATEMENTS,
+    )
+    argument_parser.add_argument(
+        "--budget-ms",
+        help="Maximum allowed import time of a statement, as STATEMENT=MS. Can be repeated.",
+        action="append",
+        default=[],
+    )
+    argument_parser.add_argument(
+        "--top", help="Number of slowest modules to show.", type=int, default=5
+    )
+
+    args = argument_parser.parse_args()
+    budgets = dict(
+        (statement, float(ms))
+        for statement, ms in (budget.rsplit("=", 1) for budget in args.budget_ms)
+    )
+
+    exceeded = False
+    for statement in args.statements:
+        modules = import_times(statement)
+        total_ms = sum(self_us for self_us, _ in modules.values()) / 1000
+        budget = budgets.get(statement)
+
+        status = ""
+        if budget is not None:
+            status = "ok" if total_ms <= budget else f"over budget of {budget:.0f}ms"
+            exceeded |= total_ms > budget
+
+        print(f"{statement}: {total_ms:.1f}ms, {len(modules)} modules {status}")
+        slowest = sorted(modules.items(), key=lambda m: m[1][1], reverse=True)
+        for module, (_, cumulative_us) in slowest[: args.top]:
+            print(f"  {cumulative_us / 1000:>8.1f}ms {module}")
+
+    if exceeded:
+        sys.exit(1)
+
+
+def import_times(statement: str) -> dict[str, tuple[int, int]]:
+    """
+    Returns the self and cumulative import times in microseconds of each module imported by the statement.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        modules[module.strip()] = (int(self_us), int(cumulative_us))
+
+    return modules
+
+
+if __name__ == "__main__":
+    main()
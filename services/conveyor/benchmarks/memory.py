@@ -0,0 +1,121 @@
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from conveyor import DataConveyor, DataFrame, config
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.memory",
+        description="Compare peak memory and latency of the single block sample normalization and concatenation "
+        "with the column-wise pandas implementation.",
+    )
+    argument_parser.add_argument(
+        "--samples",
+        help="Number of samples to normalize.",
+        type=int,
+        default=1_000_000,
+    )
+    argument_parser.add_argument(
+        "--repeat",
+        help="Number of timed calls per implementation.",
+        type=int,
+        default=5,
+    )
+
+    args = argument_parser.parse_args()
+    data_conveyor = DataConveyor(np.random.RandomState(0))
+    samples = DataFrame(
+        pd.concat(
+            data_conveyor.random_alloy_sample_chunks(5, 0.1, args.samples),
+            ignore_index=True,
+        )
+    )
+    halves = [samples.iloc[: config.MAX_SAMPLES // 2]] * 2
+
+    # Each case is made of the untraced setup of the arguments, and both implementations.
+    # The pandas normalization modifies its argument, so it's given a fresh copy every time.
+    cases = {
+        "normalize": (
+            lambda: [samples.copy()],
+            normalize_sample_weights,
+            data_conveyor.normalize_sample_weights,
+        ),
+        "concat": (
+            lambda: halves,
+            lambda *dfs: concat_samples(data_conveyor.rng, *dfs),
+            data_conveyor.concat_samples,
+        ),
+    }
+
+    print(
+        f"{'case':>10} {'implementation':>15} {'peak':>10} {'latency':>10} {'speedup':>8}"
+    )
+    for case, (setup, baseline, block) in cases.items():
+        timings = {}
+        for implementation, func in (("pandas", baseline), ("block", block)):
+            peak = peak_memory(func, setup())
+            timings[implementation] = min(
+                latency(func, setup()) for _ in range(args.repeat)
+            )
+
+            print(
+                f"{case:>10} {implementation:>15} {peak / (1 << 20):>8.2f}MB "
+                f"{timings[implementation] * 1e3:>8.2f}ms "
+                f"{timings['pandas'] / timings[implementation]:>7.1f}x"
+            )
+
+
+def normalize_sample_weights(df: pd.DataFrame) -> DataFrame:
+    """
+    Column-wise normalization, as implemented before the single block one.
+    """
+
+    weights = df["troy_ounces"]
+    for component in ["gold_ozt", "silver_ozt", "copper_ozt", "platinum_ozt"]:
+        if component in df.columns:
+            df[component] /= weights
+
+    df["troy_ounces"] = 1.0
+
+    return DataFrame(df)
+
+
+def concat_samples(rng: np.random.RandomState, *dfs: pd.DataFrame) -> DataFrame:
+    """
+    Concatenation through pandas, as implemented before the single block one.
+    """
+
+    return DataFrame(
+        pd.concat(dfs, ignore_index=True)
+        .sample(frac=1, random_state=rng)
+        .reset_index(drop=True)
+    )
+
+
+def peak_memory(func: Callable, args: list) -> int:
+    """
+    Returns the peak number of bytes allocated by the call, including its result.
+    """
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def latency(func: Callable, args: list) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import io
+import pickle
+import timeit
+
+import numpy as np
+
+from conveyor import DataConveyor, Model, ModelConveyor
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.models",
+        description="Compare size and latency of the compact model format with pickling.",
+    )
+    argument_parser.add_argument(
+        "--repeat", help="Number of timed calls per format.", type=int, default=1000
+    )
+
+    args = argument_parser.parse_args()
+    rng = np.random.RandomState(0)
+    df = DataConveyor(rng).random_alloy_samples(
+        weight_ozt=5, max_deviation=0.01, samples=100
+    )
+    x, y = df[["gold_ozt", "silver_ozt", "copper_ozt", "platinum_ozt"]], df["karat"]
+
+    model_conveyor = ModelConveyor(rng)
+    models = {
+        "linear": model_conveyor.fit_linear_regression(x, y),
+        "ridge": model_conveyor.fit_ridge(x, y),
+    }
+
+    print(
+        f"{'model':>7} {'format':>8} {'size':>8} {'save':>10} {'load':>10} {'speedup':>8}"
+    )
+    for name, model in models.items():
+        model.name = name
+        model.description = "benchmark model"
+
+        formats = {
+            "pickle": (lambda f: pickle.dump(model, f), pickle.load),
+            "compact": (model.save, Model.load),
+        }
+
+        load_timings = {}
+        for format, (save, load) in formats.items():
+            buffer = io.BytesIO()
+            save(buffer)
+            data = buffer.getvalue()
+
+            save_timing = min(
+                timeit.repeat(lambda: save(io.BytesIO()), number=1, repeat=args.repeat)
+            )
+            load_timings[format] = min(
+                timeit.repeat(
+                    lambda: load(io.BytesIO(data)), number=1, repeat=args.repeat
+                )
+            )
+
+            print(
+                f"{name:>7} {format:>8} {len(data):>7}B "
+                f"{save_timing * 1e6:>8.1f}us {load_timings[format] * 1e6:>8.1f}us "
+                f"{load_timings['pickle'] / load_timings[format]:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import timeit
+
+import numpy as np
+
+from conveyor import DataConveyor, PredefinedAlloys, config
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.samples",
+        description="Compare per-sample and batched DataConveyor sample generation.",
+    )
+    argument_parser.add_argument(
+        "--repeat", help="Number of timed calls per sample count.", type=int, default=20
+    )
+    argument_parser.add_argument(
+        "--step", help="Step between benchmarked sample counts.", type=int, default=10
+    )
+
+    args = argument_parser.parse_args()
+    conveyors = {
+        "sequential": DataConveyor(np.random.RandomState(0)),
+        "batched": DataConveyor(np.random.RandomState(0), batched=True),
+    }
+
+    print(
+        f"{'samples':>8} {'method':>9} {'sequential':>12} {'batched':>12} {'speedup':>8}"
+    )
+    for samples in sorted({1, *range(args.step, config.MAX_SAMPLES + 1, args.step)}):
+        for method in ("random", "template"):
+            timings = {
+                name: min(
+                    timeit.repeat(
+                        lambda: generate(conveyor, method, samples),
+                        number=1,
+                        repeat=args.repeat,
+                    )
+                )
+                for name, conveyor in conveyors.items()
+            }
+
+            print(
+                f"{samples:>8} {method:>9} "
+                f"{timings['sequential'] * 1000:>10.3f}ms {timings['batched'] * 1000:>10.3f}ms "
+                f"{timings['sequential'] / timings['batched']:>7.1f}x"
+            )
+
+
+def generate(conveyor: DataConveyor, method: str, samples: int):
+    if method == "random":
+        return conveyor.random_alloy_samples(
+            weight_ozt=5, max_deviation=0.01, samples=samples
+        )
+
+    return conveyor.template_alloy_samples(
+        PredefinedAlloys.ROSE_GOLD, weight_ozt=5, max_deviation=0.01, samples=samples
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import timeit
+
+import numpy as np
+
+from conveyor import DataConveyor, DataFrame, config
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(
+        prog="benchmarks.validation",
+        description="Compare per-call cost of the compiled DataFrame.validate checks and full pandera validation.",
+    )
+    argument_parser.add_argument(
+        "--repeat",
+        help="Number of timed calls per sample count.",
+        type=int,
+        default=200,
+    )
+    argument_parser.add_argument(
+        "--step", help="Step between benchmarked sample counts.", type=int, default=25
+    )
+
+    args = argument_parser.parse_args()
+    conveyor = DataConveyor(np.random.RandomState(0), batched=True)
+
+    print(f"{'samples':>8} {'pandera':>12} {'compiled':>12} {'speedup':>8}")
+    for samples in sorted({1, *range(args.step, config.MAX_SAMPLES + 1, args.step)}):
+        df = conveyor.random_alloy_samples(
+            weight_ozt=5, max_deviation=0.01, samples=samples
+        )
+
+        timings = {
+            name: min(timeit.repeat(validate, number=1, repeat=args.repeat))
+            for name, validate in (
+                ("pandera", lambda: DataFrame.Schema.validate(df)),
+                ("compiled", df.validate),
+            )
+        }
+
+        print(
+            f"{samples:>8} "
+            f"{timings['pandera'] * 1e6:>10.1f}us {timings['compiled'] * 1e6:>10.1f}us "
+            f"{timings['pandera'] / timings['compiled']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
 __all__ = [
+    "alloy",
+    "cache",
+    "collector",
     "data",
+    "instrumentation",
     "model",
     "remote",
+    "server",
     "service",
     "storage",
+    "transfer",
     "AlloyComposition",
     "DataConveyor",
     "DataFrame",
     "PredefinedAlloys",
+    "IncrementalLinearRegression",
+    "IncrementalRegression",
+    "IncrementalRidgeRegression",
     "LinearRegression",
     "Model",
     "ModelConveyor",
@@ -15,7 +27,64 @@ __all__ = [
     "GoldConveyorService",
 ]
 
-from . import data, model, remote, service, storage
-from .data import AlloyComposition, DataConveyor, DataFrame, PredefinedAlloys
-from .model import LinearRegression, Model, ModelConveyor, RidgeRegression
-from .service import GoldConveyorService
+# Modules defining the exported classes, which are imported on first access,
+# so that pandas, pandera, sklearn and pyarrow are only loaded when actually needed.
+LAZY_ATTRS = {
+    "AlloyComposition": "alloy",
+    "PredefinedAlloys": "alloy",
+    "DataConveyor": "data",
+    "DataFrame": "data",
+    "IncrementalLinearRegression": "model",
+    "IncrementalRegression": "model",
+    "IncrementalRidgeRegression": "model",
+    "LinearRegression": "model",
+    "Model": "model",
+    "ModelConveyor": "model",
+    "RidgeRegression": "model",
+    "GoldConveyorService": "service",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in LAZY_ATTRS:
+        value = getattr(importlib.import_module(f".{LAZY_ATTRS[name]}", __name__), name)
+    elif name in __all__ or name == "config":
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
+
+
+if TYPE_CHECKING:
+    from . import (
+        alloy,
+        cache,
+        collector,
+        config,
+        data,
+        instrumentation,
+        model,
+        remote,
+        server,
+        service,
+        storage,
+        transfer,
+    )
+    from .alloy import AlloyComposition, PredefinedAlloys
+    from .data import DataConveyor, DataFrame
+    from .model import (
+        IncrementalLinearRegression,
+        IncrementalRegression,
+        IncrementalRidgeRegression,
+        LinearRegression,
+        Model,
+        ModelConveyor,
+        RidgeRegression,
+    )
+    from .service import GoldConveyorService
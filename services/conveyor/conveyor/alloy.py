@@ -0,0 +1,55 @@
+from typing import Annotated
+
+import pydantic
+
+from . import config
+
+
+class AlloyComposition(pydantic.BaseModel):
+    gold_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
+    silver_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
+    copper_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
+    platinum_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
+
+    @pydantic.model_validator(mode="after")
+    def check_fraction(self):
+        fr = self.gold_fr + self.silver_fr + self.copper_fr + self.platinum_fr
+        if abs(fr - 1.0) > config.PRECISION:
+            raise ValueError("alloy composition fractions should add up to 1")
+        return self
+
+    @classmethod
+    def localized(cls, remote: "AlloyComposition") -> "AlloyComposition":
+        """
+        Recreate AlloyComposition dataclass instance from non-trusted instance,
+        revalidating it in the process.
+        """
+
+        return cls(
+            gold_fr=remote.gold_fr,
+            silver_fr=remote.silver_fr,
+            copper_fr=remote.copper_fr,
+            platinum_fr=remote.platinum_fr,
+        )
+
+
+class PredefinedAlloys:
+    YELLOW_GOLD = AlloyComposition(
+        gold_fr=0.75, silver_fr=0.125, copper_fr=0.125, platinum_fr=0
+    )
+
+    RED_GOLD = AlloyComposition(
+        gold_fr=0.75, silver_fr=0, copper_fr=0.25, platinum_fr=0
+    )
+
+    ROSE_GOLD = AlloyComposition(
+        gold_fr=0.75, silver_fr=0.025, copper_fr=0.225, platinum_fr=0
+    )
+
+    PINK_GOLD = AlloyComposition(
+        gold_fr=0.75, silver_fr=0.05, copper_fr=0.2, platinum_fr=0
+    )
+
+    WHITE_GOLD = AlloyComposition(
+        gold_fr=0.75, silver_fr=0, copper_fr=0, platinum_fr=0.25
+    )
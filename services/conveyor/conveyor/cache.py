@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    size_bytes: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests > 0 else 0.0
+
+
+class LRUCache(Generic[V]):
+    """
+    Thread-safe LRU cache bounded by the total size of its values in bytes, and optionally by the number of entries.
+    Values larger than the whole budget aren't cached at all.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Hashable, tuple[V, int]] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: V, size_bytes: int):
+        if size_bytes > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+
+            self.entries[key] = (value, size_bytes)
+            self.size_bytes += size_bytes
+            while self.size_bytes > self.max_bytes or (
+                self.max_entries is not None and len(self.entries) > self.max_entries
+            ):
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.size_bytes -= evicted_bytes
+
+    def invalidate(self, key: Hashable):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size_bytes -= entry[1]
+
+    def stats(self) -> CacheStats:
+        with self.lock:
+            return CacheStats(
+                entries=len(self.entries),
+                size_bytes=self.size_bytes,
+                hits=self.hits,
+                misses=self.misses,
+            )
@@ -0,0 +1,96 @@
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import structlog
+
+from . import storage
+
+
+@dataclass
+class CollectionStats:
+    scanned_files: int
+    deleted_files: int
+    reclaimed_bytes: int
+    duration_seconds: float
+
+
+class GarbageCollector:
+    """
+    Collector of stored files which are no longer referenced by any dataset or model entry,
+    for example because the entries have expired in the repository.
+
+    Files modified less than grace_seconds ago are never deleted,
+    since their entries might still be being saved to the repository.
+    Deletion is rate-limited by pausing for batch_interval_seconds after each batch of deleted files.
+    """
+
+    def __init__(
+        self,
+        repository: storage.RedisRepository,
+        files: storage.FileStorage,
+        grace_seconds: float,
+        batch_size: int,
+        batch_interval_seconds: float,
+    ):
+        self.repository = repository
+        self.files = files
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.batch_interval_seconds = batch_interval_seconds
+        self.logger = structlog.stdlib.get_logger("collector")
+
+    def collect(self, active: Callable[[], bool] = lambda: True) -> CollectionStats:
+        """
+        Scan the storage once, deleting the unreferenced files.
+        The scan is stopped early once active returns False.
+        """
+
+        start = time.monotonic()
+        # Any file modified before the threshold has had its entry saved
+        # before the referenced IDs are fetched, unless the entry has already expired.
+        threshold = time.time() - self.grace_seconds
+        referenced = self.repository.referenced_file_ids()
+
+        scanned = deleted = reclaimed = 0
+        batch: list[storage.StoredFile] = []
+
+        for stored in self.files.scan():
+            if not active():
+                break
+
+            scanned += 1
+            if stored.modified_at < threshold and stored.file_id not in referenced:
+                batch.append(stored)
+
+            if len(batch) >= self.batch_size:
+                deleted, reclaimed = self.__delete(batch, deleted, reclaimed)
+                batch.clear()
+                time.sleep(self.batch_interval_seconds)
+
+        deleted, reclaimed = self.__delete(batch, deleted, reclaimed)
+
+        return CollectionStats(
+            scanned_files=scanned,
+            deleted_files=deleted,
+            reclaimed_bytes=reclaimed,
+            duration_seconds=time.monotonic() - start,
+        )
+
+    def __delete(
+        self, batch: list[storage.StoredFile], deleted: int, reclaimed: int
+    ) -> tuple[int, int]:
+        for stored in batch:
+            try:
+                reclaimed += self.files.delete(stored.file_id)
+                deleted += 1
+            except FileNotFoundError:
+                pass  # already removed by someone else
+            except Exception as err:
+                self.logger.error(
+                    "unexpectedly failed to delete unreferenced file",
+                    file_id=str(stored.file_id),
+                    error=str(err),
+                )
+
+        return deleted, reclaimed
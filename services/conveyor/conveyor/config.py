@@ -1,6 +1,12 @@
 PRECISION = 1e-9
 MAX_SAMPLES = 100
+MAX_CHUNK_SAMPLES = 10_000
+MAX_STREAM_SAMPLES = 10_000_000
 KARAT_DIGITS = 2
 FINENESS_DIGITS = 3
 ACCESS_KEY_BYTES = 32
 MAX_DATA_LEN = 128
+MAX_BUFFER_BYTES = 16 * 1024 * 1024
+MAX_RIDGE_ALPHAS = 1000
+MAX_RIDGE_FOLDS = 20
+MAX_BATCH_DATASETS = 16
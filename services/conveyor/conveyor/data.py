@@ -1,63 +1,14 @@
-from typing import Annotated, Callable
+from typing import Callable, Iterable, Iterator, Optional
 
 import numpy as np
 import pandas as pd
 import pandera as pa
 import pandera.typing as pt
-import pydantic
+from rpyc.core.netref import BaseNetref
 from sklearn.model_selection import train_test_split
 
 from . import config, remote
-
-
-class AlloyComposition(pydantic.BaseModel):
-    gold_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
-    silver_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
-    copper_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
-    platinum_fr: Annotated[float, pydantic.Field(ge=0, le=1)]
-
-    @pydantic.model_validator(mode="after")
-    def check_fraction(self):
-        fr = self.gold_fr + self.silver_fr + self.copper_fr + self.platinum_fr
-        if abs(fr - 1.0) > config.PRECISION:
-            raise ValueError("alloy composition fractions should add up to 1")
-        return self
-
-    @classmethod
-    def localized(cls, remote: "AlloyComposition") -> "AlloyComposition":
-        """
-        Recreate AlloyComposition dataclass instance from non-trusted instance,
-        revalidating it in the process.
-        """
-
-        return cls(
-            gold_fr=remote.gold_fr,
-            silver_fr=remote.silver_fr,
-            copper_fr=remote.copper_fr,
-            platinum_fr=remote.platinum_fr,
-        )
-
-
-class PredefinedAlloys:
-    YELLOW_GOLD = AlloyComposition(
-        gold_fr=0.75, silver_fr=0.125, copper_fr=0.125, platinum_fr=0
-    )
-
-    RED_GOLD = AlloyComposition(
-        gold_fr=0.75, silver_fr=0, copper_fr=0.25, platinum_fr=0
-    )
-
-    ROSE_GOLD = AlloyComposition(
-        gold_fr=0.75, silver_fr=0.025, copper_fr=0.225, platinum_fr=0
-    )
-
-    PINK_GOLD = AlloyComposition(
-        gold_fr=0.75, silver_fr=0.05, copper_fr=0.2, platinum_fr=0
-    )
-
-    WHITE_GOLD = AlloyComposition(
-        gold_fr=0.75, silver_fr=0, copper_fr=0, platinum_fr=0.25
-    )
+from .alloy import AlloyComposition, PredefinedAlloys
 
 
 @remote.safe({"iloc", "head", "shape"})
@@ -91,15 +42,120 @@ class DataFrame(pd.DataFrame):
         super().__init__(*args, **kwargs)
 
     def validate(self):
-        DataFrame.Schema.validate(self)
+        """
+        Check the samples against the schema and the alloy composition invariants.
+        Valid samples are checked using a few vectorized reductions,
+        and the much slower pandera validation is only used to report the errors of invalid ones.
+        """
+
+        values = COMPILED_SCHEMA.values(self)
+        if values is None:
+            DataFrame.Schema.validate(self)
+            values = self[COMPILED_SCHEMA.columns].to_numpy(dtype=np.float64)
+
+        gold, silver, copper, platinum, troy_ounces, karat, fineness = (
+            values[:, COMPILED_SCHEMA.columns.index(column)]
+            for column in (
+                "gold_ozt",
+                "silver_ozt",
+                "copper_ozt",
+                "platinum_ozt",
+                "troy_ounces",
+                "karat",
+                "fineness",
+            )
+        )
+        karat_fr = karat / 24
+        tolerance = config.PRECISION * np.maximum(troy_ounces, 1)
+
+        if not (
+            np.all(np.abs(gold + silver + copper + platinum - troy_ounces) <= tolerance)
+            and np.all(
+                np.abs(karat_fr * troy_ounces - gold)
+                <= KARAT_FR_TOLERANCE * troy_ounces + tolerance
+            )
+            and np.all(
+                np.abs(karat_fr - fineness / 1000)
+                <= KARAT_FR_TOLERANCE + FINENESS_FR_TOLERANCE
+            )
+        ):
+            raise ValueError("sample alloy compositions are inconsistent")
+
+
+class CompiledSchema:
+    """
+    Column dtypes and range checks of a pandera dataframe schema,
+    which are checked together using a single vectorized reduction.
+    """
+
+    def __init__(self, schema: pa.DataFrameSchema):
+        self.columns: list[str] = []
+        self.dtypes: dict[str, np.dtype] = {}
+        lower: list[float] = []
+        upper: list[float] = []
+
+        for name, column in schema.columns.items():
+            if not column.required or column.nullable:
+                raise ValueError(f"column {name} should be required and non-nullable")
+
+            self.columns.append(name)
+            self.dtypes[name] = np.dtype(str(column.dtype))
+            lower.append(-np.inf)
+            upper.append(np.inf)
+
+            for check in column.checks:
+                if check.name == "greater_than_or_equal_to":
+                    lower[-1] = check.statistics["min_value"]
+                elif check.name == "less_than_or_equal_to":
+                    upper[-1] = check.statistics["max_value"]
+                else:
+                    raise ValueError(
+                        f"check {check.name} of column {name} is unsupported"
+                    )
+
+        self.lower = np.array(lower)
+        self.upper = np.array(upper)
+
+    def values(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Returns the schema columns as a (samples, columns) matrix if the dataframe satisfies the schema, otherwise None.
+        Null values never satisfy the range checks, since comparisons with NaN are false.
+        """
+
+        dtypes = dict(zip(df.columns, df.dtypes))
+        if len(dtypes) != len(df.columns) or any(
+            dtypes.get(column) != dtype for column, dtype in self.dtypes.items()
+        ):
+            return None
+
+        # Dataframes with exactly the schema columns are converted without reindexing.
+        if list(df.columns) == self.columns:
+            values = df.to_numpy()
+        else:
+            values = df.reindex(columns=self.columns).to_numpy()
+
+        if not np.all((values >= self.lower) & (values <= self.upper)):
+            return None
+
+        return values
+
+
+COMPILED_SCHEMA = CompiledSchema(DataFrame.Schema.to_schema())
+# Maximum errors of the karat and fineness fractions due to rounding.
+KARAT_FR_TOLERANCE = 0.5 * 10**-config.KARAT_DIGITS / 24 + config.PRECISION
+FINENESS_FR_TOLERANCE = 0.5 * 10**-config.FINENESS_DIGITS / 1000 + config.PRECISION
 
 
 @remote.safe(
     {
         "template_alloy_samples",
         "random_alloy_samples",
+        "template_alloy_sample_chunks",
+        "random_alloy_sample_chunks",
         "normalize_sample_weights",
+        "normalize_sample_chunks",
         "concat_samples",
+        "concat_sample_chunks",
         "split_samples",
     }
 )
@@ -119,8 +175,20 @@ class DataConveyor:
         ]
     )
 
-    def __init__(self, rng: np.random.RandomState):
+    RANDOM_ALLOY_FRACTIONS = np.array(
+        [
+            [alloy.gold_fr, alloy.silver_fr, alloy.copper_fr, alloy.platinum_fr]
+            for alloy in RANDOM_ALLOYS
+        ],
+        dtype=np.float64,
+    )
+
+    def __init__(self, rng: np.random.RandomState, batched: bool = False):
         self.rng = rng
+        # Batched generation builds all samples at once using array operations,
+        # which is much faster, but consumes the random state in a different order,
+        # so it has to be requested explicitly to keep the per-sample output reproducible.
+        self.batched = batched
 
     def template_alloy_samples(
         self,
@@ -138,9 +206,16 @@ class DataConveyor:
 
         validated_template = AlloyComposition.localized(template)
 
-        # TODO optimize generation using template alloy by replacing operations
-        # on each sample with operations on an array of samples.
-        # Unfortunately, this means that the sample generation process would be different for random_alloy_samples.
+        if self.batched:
+            return self.__generate_sample_batch(
+                weight_ozt,
+                max_deviation,
+                samples,
+                lambda n: DataConveyor.__template_alloy_fractions(
+                    validated_template, n
+                ),
+            )
+
         return self.__generate_samples(
             weight_ozt,
             max_deviation,
@@ -157,6 +232,14 @@ class DataConveyor:
         A pandas DataFrame is returned, containing the selected samples.
         """
 
+        if self.batched:
+            return self.__generate_sample_batch(
+                weight_ozt,
+                max_deviation,
+                samples,
+                self.__random_alloy_fractions,
+            )
+
         return self.__generate_samples(
             weight_ozt,
             max_deviation,
@@ -167,6 +250,49 @@ class DataConveyor:
             ),
         )
 
+    def template_alloy_sample_chunks(
+        self,
+        template: AlloyComposition,
+        weight_ozt: float,
+        max_deviation: float,
+        samples: int,
+        chunk_samples: int = config.MAX_CHUNK_SAMPLES,
+    ) -> Iterator[DataFrame]:
+        """
+        Same as template_alloy_samples, but allows selecting a much larger number of samples,
+        which are generated lazily and returned in DataFrame chunks of at most chunk_samples samples.
+        """
+
+        validated_template = AlloyComposition.localized(template)
+
+        return self.__generate_sample_chunks(
+            weight_ozt,
+            max_deviation,
+            samples,
+            chunk_samples,
+            lambda n: DataConveyor.__template_alloy_fractions(validated_template, n),
+        )
+
+    def random_alloy_sample_chunks(
+        self,
+        weight_ozt: float,
+        max_deviation: float,
+        samples: int,
+        chunk_samples: int = config.MAX_CHUNK_SAMPLES,
+    ) -> Iterator[DataFrame]:
+        """
+        Same as random_alloy_samples, but allows selecting a much larger number of samples,
+        which are generated lazily and returned in DataFrame chunks of at most chunk_samples samples.
+        """
+
+        return self.__generate_sample_chunks(
+            weight_ozt,
+            max_deviation,
+            samples,
+            chunk_samples,
+            self.__random_alloy_fractions,
+        )
+
     def normalize_sample_weights(self, df: pd.DataFrame) -> DataFrame:
         """
         Scale sample alloy composition to 1 troy ounce.
@@ -176,9 +302,29 @@ class DataConveyor:
         if "troy_ounces" not in df.columns:
             raise ValueError("troy_ounces column must be present for normalization")
 
-        weights = df["troy_ounces"]
         components = ["gold_ozt", "silver_ozt", "copper_ozt", "platinum_ozt"]
 
+        values = DataConveyor.__float_block(df)
+        if values is not None:
+            # Local float64 samples are normalized with one broadcasted divide on their single block,
+            # which is modified in place, like the columns are otherwise.
+            if not values.flags.writeable:
+                values = np.array(values)
+
+            weights_index = df.columns.get_loc("troy_ounces")
+            weights = values[:, weights_index].copy()
+            np.divide(
+                values,
+                weights[:, np.newaxis],
+                out=values,
+                where=df.columns.isin(components),
+            )
+            values[:, weights_index] = 1.0
+
+            return DataFrame(values, index=df.index, columns=df.columns, copy=False)
+
+        weights = df["troy_ounces"]
+
         for component in components:
             if component in df.columns:
                 df[component] /= weights
@@ -187,6 +333,16 @@ class DataConveyor:
 
         return DataFrame(df)
 
+    def normalize_sample_chunks(
+        self, chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[DataFrame]:
+        """
+        Lazily scale each of the sample DataFrame chunks to 1 troy ounce, like normalize_sample_weights.
+        """
+
+        for chunk in chunks:
+            yield self.normalize_sample_weights(DataConveyor.__bounded_chunk(chunk))
+
     def concat_samples(self, *dfs: pd.DataFrame) -> DataFrame:
         """
         Concatentates multiple sample DataFrames vertically.
@@ -199,12 +355,45 @@ class DataConveyor:
                 f"total number of samples after concatenating dataframes should not be more than {config.MAX_SAMPLES}"
             )
 
+        shuffled = self.__shuffled_block(dfs)
+        if shuffled is not None:
+            return shuffled
+
         return DataFrame(
             pd.concat(dfs, ignore_index=True)
             .sample(frac=1, random_state=self.rng)
             .reset_index(drop=True)
         )
 
+    def concat_sample_chunks(
+        self, *streams: Iterable[pd.DataFrame]
+    ) -> Iterator[DataFrame]:
+        """
+        Lazily concatenates multiple streams of sample DataFrame chunks.
+
+        Since the streams are never fully loaded, samples are shuffled only within each chunk,
+        while the chunks themselves are interleaved between the streams in random order.
+        """
+
+        iterators = [iter(stream) for stream in streams]
+        while iterators:
+            i = self.rng.randint(len(iterators))
+
+            chunk = next(iterators[i], None)
+            if chunk is None:
+                iterators.pop(i)
+                continue
+
+            chunk = DataConveyor.__bounded_chunk(chunk)
+            shuffled = self.__shuffled_block([chunk])
+            if shuffled is not None:
+                yield shuffled
+                continue
+
+            yield DataFrame(
+                chunk.sample(frac=1, random_state=self.rng).reset_index(drop=True)
+            )
+
     def split_samples(
         self, *dfs: pd.DataFrame, proportion: float
     ) -> list[pd.DataFrame]:
@@ -226,6 +415,37 @@ class DataConveyor:
             )
         ]
 
+    def __shuffled_block(self, dfs: Iterable[pd.DataFrame]) -> Optional[DataFrame]:
+        """
+        Concatenates and shuffles local float64 dataframes with the same columns into a single new block,
+        or returns None if the dataframes can't be handled this way.
+        """
+
+        dfs = list(dfs)
+        blocks = [DataConveyor.__float_block(df) for df in dfs]
+        if not dfs or any(
+            block is None or not df.columns.equals(dfs[0].columns)
+            for df, block in zip(dfs, blocks)
+        ):
+            return None
+
+        # The permutation is the same as the one drawn by DataFrame.sample(frac=1),
+        # so the result matches shuffling the concatenated dataframe,
+        # but each block is scattered directly to its shuffled rows instead.
+        samples = sum(len(df) for df in dfs)
+        permutation = self.rng.permutation(samples)
+        destinations = np.empty(samples, dtype=np.intp)
+        destinations[permutation] = np.arange(samples)
+
+        shuffled = np.empty((samples, len(dfs[0].columns)), dtype=np.float64)
+        start = 0
+        for block in blocks:
+            assert block is not None
+            shuffled[destinations[start : start + len(block)]] = block
+            start += len(block)
+
+        return DataFrame(shuffled, columns=dfs[0].columns, copy=False)
+
     def __generate_samples(
         self,
         weight_ozt: float,
@@ -233,20 +453,10 @@ class DataConveyor:
         samples: int,
         generator: Callable[[], np.ndarray],
     ) -> DataFrame:
-        if weight_ozt < 0:
-            raise ValueError("sample weight should be non-negative")
-        elif max_deviation < 0 or max_deviation > 1:
-            raise ValueError("max deviation should be a fraction")
-        elif samples < 0 or samples > config.MAX_SAMPLES:
-            raise ValueError(
-                f"a non-negative number of samples no more than {config.MAX_SAMPLES} should be specified"
-            )
-
-        # Array of generated weights deviating no more than max_deviation
-        # from the dezired weight in troy ounces.
-        weights = weight_ozt * (
-            1 - (2 * max_deviation * self.rng.random(samples)) + max_deviation
+        DataConveyor.__check_sample_params(
+            weight_ozt, max_deviation, samples, config.MAX_SAMPLES
         )
+        weights = self.__generate_weights(weight_ozt, max_deviation, samples)
 
         df = DataFrame()
         for i in range(samples):
@@ -271,18 +481,91 @@ class DataConveyor:
 
         return df
 
+    def __generate_sample_batch(
+        self,
+        weight_ozt: float,
+        max_deviation: float,
+        samples: int,
+        generator: Callable[[int], np.ndarray],
+        max_samples: int = config.MAX_SAMPLES,
+    ) -> DataFrame:
+        DataConveyor.__check_sample_params(
+            weight_ozt, max_deviation, samples, max_samples
+        )
+        weights = self.__generate_weights(weight_ozt, max_deviation, samples)
+
+        # Same steps as in __randomize_alloy, but performed on a (samples, 4) matrix of fractions.
+        fractions = generator(samples)
+        fractions *= 1 - max_deviation * self.rng.random(fractions.shape)
+
+        shortage = 1 - np.sum(fractions, axis=1, keepdims=True)
+        shortage_distribution = self.rng.random(fractions.shape)
+        shortage_distribution *= fractions > config.PRECISION
+        shortage_distribution /= np.sum(shortage_distribution, axis=1, keepdims=True)
+        fractions += shortage * shortage_distribution
+
+        alloy_ozt = fractions * weights[:, np.newaxis]
+
+        df = DataFrame(
+            {
+                "gold_ozt": alloy_ozt[:, 0],
+                "silver_ozt": alloy_ozt[:, 1],
+                "copper_ozt": alloy_ozt[:, 2],
+                "platinum_ozt": alloy_ozt[:, 3],
+                "troy_ounces": weights,
+                "karat": np.round(fractions[:, 0] * 24, config.KARAT_DIGITS),
+                "fineness": np.round(fractions[:, 0] * 1000, config.FINENESS_DIGITS),
+            }
+        )
+
+        # Perform basic sanity check after dataframe construction.
+        df.validate()
+
+        return df
+
+    def __generate_sample_chunks(
+        self,
+        weight_ozt: float,
+        max_deviation: float,
+        samples: int,
+        chunk_samples: int,
+        generator: Callable[[int], np.ndarray],
+    ) -> Iterator[DataFrame]:
+        # Arguments are checked before returning the actual generator
+        # so that errors are raised on call instead of the first iteration.
+        DataConveyor.__check_sample_params(
+            weight_ozt, max_deviation, samples, config.MAX_STREAM_SAMPLES
+        )
+        if chunk_samples < 1 or chunk_samples > config.MAX_CHUNK_SAMPLES:
+            raise ValueError(
+                f"a positive number of chunk samples no more than {config.MAX_CHUNK_SAMPLES} should be specified"
+            )
+
+        def chunks() -> Iterator[DataFrame]:
+            for start in range(0, samples, chunk_samples):
+                yield self.__generate_sample_batch(
+                    weight_ozt,
+                    max_deviation,
+                    min(chunk_samples, samples - start),
+                    generator,
+                    max_samples=chunk_samples,
+                )
+
+        return chunks()
+
+    def __generate_weights(
+        self, weight_ozt: float, max_deviation: float, samples: int
+    ) -> np.ndarray:
+        # Array of generated weights deviating no more than max_deviation
+        # from the dezired weight in troy ounces.
+        return weight_ozt * (
+            1 - (2 * max_deviation * self.rng.random(samples)) + max_deviation
+        )
+
     def __randomize_alloy(
         self, template: AlloyComposition, max_deviation: float
     ) -> np.ndarray:
-        fractions = np.array(
-            [
-                template.gold_fr,
-                template.silver_fr,
-                template.copper_fr,
-                template.platinum_fr,
-            ],
-            dtype=np.float64,
-        )
+        fractions = DataConveyor.__alloy_fractions(template)
 
         # Since this private method accepts only validated compositions,
         # originally, the fractions sum to 1.
@@ -297,3 +580,64 @@ class DataConveyor:
         fractions += shortage * shortage_distribution
 
         return fractions
+
+    def __random_alloy_fractions(self, samples: int) -> np.ndarray:
+        return DataConveyor.RANDOM_ALLOY_FRACTIONS[
+            self.rng.randint(len(DataConveyor.RANDOM_ALLOY_FRACTIONS), size=samples)
+        ]
+
+    @staticmethod
+    def __template_alloy_fractions(
+        template: AlloyComposition, samples: int
+    ) -> np.ndarray:
+        return np.tile(DataConveyor.__alloy_fractions(template), (samples, 1))
+
+    @staticmethod
+    def __check_sample_params(
+        weight_ozt: float, max_deviation: float, samples: int, max_samples: int
+    ):
+        if weight_ozt < 0:
+            raise ValueError("sample weight should be non-negative")
+        elif max_deviation < 0 or max_deviation > 1:
+            raise ValueError("max deviation should be a fraction")
+        elif samples < 0 or samples > max_samples:
+            raise ValueError(
+                f"a non-negative number of samples no more than {max_samples} should be specified"
+            )
+
+    @staticmethod
+    def __float_block(df: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Returns the values of a local dataframe with unique float64 columns as a single 2-D array,
+        which is a view of the dataframe data when it's already stored as a single block.
+        """
+
+        if (
+            isinstance(df, BaseNetref)
+            or not isinstance(df, pd.DataFrame)
+            or not df.columns.is_unique
+            or not all(dtype == np.float64 for dtype in df.dtypes)
+        ):
+            return None
+
+        return df.to_numpy(dtype=np.float64, copy=False)
+
+    @staticmethod
+    def __bounded_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+        if len(chunk) > config.MAX_CHUNK_SAMPLES:
+            raise ValueError(
+                f"sample chunks should contain no more than {config.MAX_CHUNK_SAMPLES} samples"
+            )
+        return chunk
+
+    @staticmethod
+    def __alloy_fractions(alloy: AlloyComposition) -> np.ndarray:
+        return np.array(
+            [
+                alloy.gold_fr,
+                alloy.silver_fr,
+                alloy.copper_fr,
+                alloy.platinum_fr,
+            ],
+            dtype=np.float64,
+        )
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from rpyc.core import channel, protocol
+
+# Upper bounds of the call latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float("inf"))
+
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * len(LATENCY_BUCKETS)
+    )
+    round_trips: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+    def latency_quantile(self, q: float) -> float:
+        """
+        Returns the upper bound of the histogram bucket containing the specified latency quantile.
+        """
+
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return LATENCY_BUCKETS[-1]
+
+
+class Registry:
+    """
+    Thread-safe per-method statistics of the calls made by clients to the exposed methods.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods: dict[str, MethodStats] = {}
+
+    def record(self, method: str, call: "Call", seconds: float, failed: bool):
+        with self.lock:
+            stats = self.methods.setdefault(method, MethodStats())
+            stats.calls += 1
+            stats.errors += failed
+            stats.seconds += seconds
+            stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.round_trips += call.round_trips
+            stats.bytes_received += call.bytes_received
+            stats.bytes_sent += call.bytes_sent
+
+    def record_reply(self, method: str, bytes_sent: int):
+        """
+        Add the reply to the statistics of its call.
+        Replies of calls recorded before the previous drain are dropped, rather than reported without any calls.
+        """
+
+        with self.lock:
+            stats = self.methods.get(method)
+            if stats is not None:
+                stats.bytes_sent += bytes_sent
+
+    def drain(self) -> dict[str, MethodStats]:
+        """
+        Returns the statistics collected since the previous drain.
+        """
+
+        with self.lock:
+            methods, self.methods = self.methods, {}
+
+        return methods
+
+
+@dataclass
+class Call:
+    method: str
+    # The call itself, along with the nested requests made to the client during it.
+    round_trips: int = 1
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+
+# Set once instrumentation is enabled, so that the disabled case costs a single global lookup.
+registry: Optional[Registry] = None
+local = threading.local()
+
+
+def enable() -> Registry:
+    """
+    Enable instrumentation of the exposed methods for this process.
+    The rpyc connections are patched to attribute the transferred data to the method being called.
+    """
+
+    global registry
+
+    if registry is None:
+        patch_rpyc()
+        registry = Registry()
+
+    return registry
+
+
+def instrumented(method: str, func: Callable) -> Callable:
+    """
+    Wrap the exposed method accessed by a client to record its call.
+    """
+
+    def wrapper(*args, **kwargs) -> Any:
+        # The request containing the call arguments has been received right before the call.
+        call = Call(method, bytes_received=getattr(local, "last_received", 0))
+        calls = current_calls()
+        calls.append(call)
+
+        failed = False
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            calls.pop()
+            # The reply is sent right after the call returns.
+            local.pending_reply = method
+            if registry is not None:
+                registry.record(method, call, elapsed, failed)
+
+    return wrapper
+
+
+def current_calls() -> list[Call]:
+    calls = getattr(local, "calls", None)
+    if calls is None:
+        calls = local.calls = []
+
+    return calls
+
+
+def patch_rpyc():
+    """
+    Monkey-patch rpyc channels and connections to count the data and requests of the instrumented calls.
+    """
+
+    recv = channel.Channel.recv
+    send = channel.Channel.send
+    sync_request = protocol.Connection.sync_request
+
+    def patched_recv(self):
+        data = recv(self)
+        calls = current_calls()
+        if calls:
+            calls[-1].bytes_received += len(data)
+        else:
+            local.last_received = len(data)
+            local.pending_reply = None
+
+        return data
+
+    def patched_send(self, data):
+        calls = current_calls()
+        if calls:
+            calls[-1].bytes_sent += len(data)
+        else:
+            pending_reply = getattr(local, "pending_reply", None)
+            if pending_reply is not None and registry is not None:
+                local.pending_reply = None
+                registry.record_reply(pending_reply, len(data))
+
+        return send(self, data)
+
+    def patched_sync_request(self, handler, *args):
+        calls = current_calls()
+        if calls:
+            calls[-1].round_trips += 1
+
+        return sync_request(self, handler, *args)
+
+    channel.Channel.recv = patched_recv
+    channel.Channel.send = patched_send
+    protocol.Connection.sync_request = patched_sync_request
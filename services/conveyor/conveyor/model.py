@@ -1,14 +1,22 @@
 import io
+import json
+import math
 import pickle
+import struct
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, Sequence, TypeVar
 
 import numpy as np
 import numpy.typing as npt
+import pandas as pd
 from sklearn import linear_model, metrics
+from sklearn.model_selection import train_test_split
 
-from . import config, remote
+from . import config, remote, transfer
 
 
-@remote.safe({"predict", "score", "name", "description"})
+@remote.safe({"predict", "predict_arrow", "score", "name", "description"})
 class Model:
     name: str
     description: str
@@ -17,12 +25,98 @@ class Model:
         self.name = ""
         self.description = ""
 
+    def predict_arrow(self, x: npt.ArrayLike | bytes) -> bytes:
+        """
+        Predict using the model, returning the predictions as an Arrow IPC stream buffer.
+        The input can be passed as an arrow buffer as well.
+        """
+
+        return transfer.encode(self.predict(transfer.localized(x)))  # type: ignore # implemented by estimators
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory taken by the fitted model.
+        """
+
+        parameters = (getattr(self, "coef_", None), getattr(self, "intercept_", None))
+        return MODEL_BASE_BYTES + sum(np.asarray(p).nbytes for p in parameters)
+
     def save(self, file: io.BufferedIOBase):
-        pickle.dump(self, file)
+        """
+        Write the fitted model in the compact model format, which contains only the parameters needed for prediction:
+        magic, little-endian u32 header length, JSON header, and the float64 coefficients and intercept.
+        """
+
+        coef = np.asarray(self.coef_, dtype="<f8")  # type: ignore # set by estimators
+        intercept = np.asarray(self.intercept_, dtype="<f8")  # type: ignore
+        feature_names = getattr(self, "feature_names_in_", None)
+
+        header = json.dumps(
+            {
+                "estimator": MODEL_ESTIMATORS[type(self)],
+                "name": self.name,
+                "description": self.description,
+                "alpha": getattr(self, "alpha", None),
+                "n_features_in": int(self.n_features_in_),  # type: ignore
+                "feature_names_in": (
+                    None if feature_names is None else list(map(str, feature_names))
+                ),
+                "coef_shape": coef.shape,
+                "intercept_shape": intercept.shape,
+            },
+            separators=(",", ":"),
+        ).encode()
+
+        file.write(MODEL_MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        file.write(coef.tobytes())
+        file.write(intercept.tobytes())
 
     @staticmethod
     def load(file: io.BufferedIOBase) -> "Model":
-        return pickle.load(file)
+        """
+        Read a model written by save, without unpickling anything.
+        Models pickled before the compact format was introduced are still loaded.
+        """
+
+        data = file.read()
+        if not data.startswith(MODEL_MAGIC):
+            return pickle.loads(data)
+
+        offset = len(MODEL_MAGIC) + 4
+        (header_len,) = struct.unpack_from("<I", data, len(MODEL_MAGIC))
+        header = json.loads(data[offset : offset + header_len])
+        offset += header_len
+
+        if header["estimator"] == "linear_regression":
+            model: LinearRegression | RidgeRegression = LinearRegression()
+        elif header["estimator"] == "ridge":
+            model = RidgeRegression(alpha=header["alpha"])
+            model.n_iter_ = None
+        else:
+            raise ValueError(f"unknown model estimator {header['estimator']}")
+
+        model.name = header["name"]
+        model.description = header["description"]
+        model.n_features_in_ = header["n_features_in"]
+
+        coef_size = math.prod(header["coef_shape"])
+        model.coef_ = np.frombuffer(data, "<f8", coef_size, offset).reshape(
+            header["coef_shape"]
+        )
+        offset += coef_size * 8
+
+        intercept = np.frombuffer(
+            data, "<f8", math.prod(header["intercept_shape"]), offset
+        ).reshape(header["intercept_shape"])
+        model.intercept_ = float(intercept) if intercept.ndim == 0 else intercept
+
+        if header["feature_names_in"] is not None:
+            model.feature_names_in_ = np.array(header["feature_names_in"], dtype=object)
+
+        return model
 
 
 class LinearRegression(linear_model.LinearRegression, Model):
@@ -32,37 +126,263 @@ class LinearRegression(linear_model.LinearRegression, Model):
 
 
 class RidgeRegression(linear_model.Ridge, Model):
-    def __init__(self, alpha: float, random_state: np.random.RandomState):
+    def __init__(
+        self, alpha: float, random_state: Optional[np.random.RandomState] = None
+    ):
         linear_model.Ridge.__init__(self, alpha=alpha, random_state=random_state)
         Model.__init__(self)
 
 
+MODEL_MAGIC = b"GCM\x01"
+MODEL_BASE_BYTES = 2048  # estimator object with its attributes
+MODEL_ESTIMATORS: dict[type[Model], str] = {
+    LinearRegression: "linear_regression",
+    RidgeRegression: "ridge",
+}
+
+R = TypeVar("R", LinearRegression, RidgeRegression)
+
+
+@remote.safe({"partial_fit", "finalize", "n_samples"})
+class IncrementalRegression(ABC, Generic[R]):
+    """
+    Base for regression models which are fitted incrementally on chunks of data.
+    Only the sufficient statistics of the data seen so far are stored,
+    which take O(features^2) memory regardless of the number of samples.
+    """
+
+    n_samples: int
+
+    def __init__(self):
+        self.n_samples = 0
+        self.feature_names: Optional[np.ndarray] = None
+        self.target_1d = False
+        # Means of the features and targets, with the (co)variance sums centered around them.
+        self.x_mean = np.empty(0)
+        self.y_mean = np.empty(0)
+        self.xx = np.empty((0, 0))
+        self.xy = np.empty((0, 0))
+
+    def partial_fit(
+        self, x: npt.ArrayLike | bytes, y: npt.ArrayLike | bytes
+    ) -> "IncrementalRegression[R]":
+        """
+        Update the model with another chunk of data, which can also be passed as Arrow IPC buffers.
+        All chunks should have the same features and targets.
+        """
+
+        x, y = transfer.localized(x), transfer.localized(y)
+        feature_names = IncrementalRegression.__feature_names(x)
+        x_arr = np.array(x, dtype=np.float64)
+        y_arr = np.array(y, dtype=np.float64)
+
+        if x_arr.ndim != 2:
+            raise ValueError("x should be a 2-dimensional matrix")
+        elif y_arr.ndim not in (1, 2):
+            raise ValueError("y should be an array or a 2-dimensional matrix")
+        elif len(x_arr) != len(y_arr):
+            raise ValueError("x and y should contain the same number of samples")
+        elif len(x_arr) == 0:
+            return self
+
+        target_1d = y_arr.ndim == 1
+        if target_1d:
+            y_arr = y_arr[:, np.newaxis]
+
+        if self.n_samples == 0:
+            self.feature_names = feature_names
+            self.target_1d = target_1d
+            self.x_mean = np.zeros(x_arr.shape[1])
+            self.y_mean = np.zeros(y_arr.shape[1])
+            self.xx = np.zeros((x_arr.shape[1], x_arr.shape[1]))
+            self.xy = np.zeros((x_arr.shape[1], y_arr.shape[1]))
+        elif (
+            x_arr.shape[1] != len(self.x_mean)
+            or y_arr.shape[1] != len(self.y_mean)
+            or target_1d != self.target_1d
+        ):
+            raise ValueError("chunk shape differs from the previously seen chunks")
+
+        # Merge the centered statistics of the chunk with the accumulated ones,
+        # which is numerically more stable than summing raw X^T X and X^T y.
+        n = len(x_arr)
+        x_chunk_mean = x_arr.mean(axis=0)
+        y_chunk_mean = y_arr.mean(axis=0)
+        x_centered = x_arr - x_chunk_mean
+        y_centered = y_arr - y_chunk_mean
+
+        total = self.n_samples + n
+        x_delta = x_chunk_mean - self.x_mean
+        y_delta = y_chunk_mean - self.y_mean
+        scale = self.n_samples * n / total
+
+        self.xx += x_centered.T @ x_centered + scale * np.outer(x_delta, x_delta)
+        self.xy += x_centered.T @ y_centered + scale * np.outer(x_delta, y_delta)
+        self.x_mean += x_delta * n / total
+        self.y_mean += y_delta * n / total
+        self.n_samples = total
+
+        return self
+
+    def finalize(self) -> R:
+        """
+        Build the fitted model from the data seen so far.
+        The resulting model can be used to predict or score a prediction.
+        """
+
+        if self.n_samples == 0:
+            raise ValueError("at least one non-empty chunk should be fitted")
+
+        model = self._solve()
+
+        coef = model.coef_
+        intercept = self.y_mean - self.x_mean @ coef
+        model.coef_ = coef[:, 0] if self.target_1d else coef.T
+        model.intercept_ = intercept[0] if self.target_1d else intercept
+        model.n_features_in_ = len(self.x_mean)
+        if self.feature_names is not None:
+            model.feature_names_in_ = self.feature_names
+
+        return model
+
+    @abstractmethod
+    def _solve(self) -> R:
+        """
+        Return a model with coef_ temporarily set to the (features, targets) solution.
+        """
+
+    @staticmethod
+    def __feature_names(x: npt.ArrayLike) -> Optional[np.ndarray]:
+        columns = getattr(x, "columns", None)
+        if columns is None:
+            return None
+
+        names = [str(column) for column in columns]
+        return np.array(names, dtype=object)
+
+
+class IncrementalLinearRegression(IncrementalRegression[LinearRegression]):
+    def _solve(self) -> LinearRegression:
+        model = LinearRegression()
+        model.coef_ = np.linalg.lstsq(self.xx, self.xy, rcond=None)[0]
+
+        singular = np.sqrt(np.clip(np.linalg.eigvalsh(self.xx)[::-1], 0, None))
+        model.singular_ = singular
+        model.rank_ = int(
+            np.sum(singular > singular[0] * max(self.xx.shape) * np.finfo(float).eps)
+        )
+
+        return model
+
+
+class IncrementalRidgeRegression(IncrementalRegression[RidgeRegression]):
+    def __init__(self, alpha: float, random_state: np.random.RandomState):
+        super().__init__()
+        self.alpha = alpha
+        self.random_state = random_state
+
+    def _solve(self) -> RidgeRegression:
+        model = RidgeRegression(alpha=self.alpha, random_state=self.random_state)
+        model.coef_ = np.linalg.solve(
+            self.xx + self.alpha * np.eye(len(self.xx)), self.xy
+        )
+        model.n_iter_ = None
+
+        return model
+
+
+@remote.safe({"alphas", "coefs", "intercepts", "cv_errors", "best_alpha", "model"})
+@dataclass
+class RidgePath:
+    """
+    Ridge regression solutions for a sequence of alphas, along with their cross-validated MSE if requested.
+    Coefficients of each alpha have the same shape as RidgeRegression.coef_,
+    and are returned as tuples so that they're transferred by value.
+    """
+
+    alphas: tuple[float, ...]
+    coefs: tuple
+    intercepts: tuple
+    cv_errors: Optional[tuple[float, ...]]
+    feature_names: Optional[np.ndarray]
+
+    @property
+    def best_alpha(self) -> float:
+        """
+        Alpha with the lowest cross-validated error, or the first alpha without cross-validation.
+        """
+
+        if self.cv_errors is None:
+            return self.alphas[0]
+
+        return self.alphas[int(np.argmin(self.cv_errors))]
+
+    def model(self, index: int) -> RidgeRegression:
+        """
+        Build the fitted model for the alpha with the specified index.
+        """
+
+        index = int(index)
+        coef = np.array(self.coefs[index], dtype=np.float64)
+        intercept = np.array(self.intercepts[index], dtype=np.float64)
+
+        model = RidgeRegression(alpha=self.alphas[index])
+        model.coef_ = coef
+        model.intercept_ = float(intercept) if intercept.ndim == 0 else intercept
+        model.n_features_in_ = coef.shape[-1]
+        model.n_iter_ = None
+        if self.feature_names is not None:
+            model.feature_names_in_ = self.feature_names
+
+        return model
+
+
 @remote.safe(
-    {"fit_linear_regression", "fit_ridge", "mean_absolute_error", "mean_squared_error"}
+    {
+        "fit_linear_regression",
+        "fit_ridge",
+        "ridge_path",
+        "incremental_linear_regression",
+        "incremental_ridge",
+        "mean_absolute_error",
+        "mean_squared_error",
+        "predict_dataset",
+        "dataset_mean_absolute_error",
+        "dataset_mean_squared_error",
+    }
 )
 class ModelConveyor:
     """
     Conveyor for training machine learning models on processed gold samples.
     """
 
-    def __init__(self, rng: np.random.RandomState):
+    def __init__(
+        self,
+        rng: np.random.RandomState,
+        load_model: Optional[Callable[[str], Model]] = None,
+        load_dataset: Optional[Callable[[str], pd.DataFrame]] = None,
+    ):
         self.rng = rng
+        self.load_model = load_model
+        self.load_dataset = load_dataset
 
     def fit_linear_regression(
-        self, x: npt.ArrayLike, y: npt.ArrayLike
+        self, x: npt.ArrayLike | bytes, y: npt.ArrayLike | bytes
     ) -> LinearRegression:
         """
         Initialize and fit a basic linear regression model to the given data.
+        The data can be passed as Arrow IPC buffers to avoid transferring it element by element.
         The resulting model can be used to predict or score a prediction.
         """
 
-        return LinearRegression().fit(x, y)
+        return LinearRegression().fit(transfer.localized(x), transfer.localized(y))
 
     def fit_ridge(
-        self, x: npt.ArrayLike, y: npt.ArrayLike, alpha: float = 1.0
+        self, x: npt.ArrayLike | bytes, y: npt.ArrayLike | bytes, alpha: float = 1.0
     ) -> RidgeRegression:
         """
         Initialize and fit a Ridge regression model to the given data with the specified alpha.
+        The data can be passed as Arrow IPC buffers to avoid transferring it element by element.
         The resulting model can be used to predict or score a prediction.
         """
 
@@ -71,20 +391,251 @@ class ModelConveyor:
         if alpha <= config.PRECISION:
             raise ValueError(f"alpha must be greater than {config.PRECISION}")
 
-        return RidgeRegression(alpha=alpha, random_state=self.rng).fit(np.array(x), y)
+        return RidgeRegression(alpha=alpha, random_state=self.rng).fit(
+            np.array(transfer.localized(x)), transfer.localized(y)
+        )
+
+    def ridge_path(
+        self,
+        x: npt.ArrayLike | bytes,
+        y: npt.ArrayLike | bytes,
+        alphas: Sequence[float],
+        folds: int = 0,
+        proportion: float = 0.8,
+    ) -> RidgePath:
+        """
+        Fit Ridge regression for all of the specified alphas at once using a single SVD of the data,
+        which gives the same solutions as calling fit_ridge for each of them.
+        The data can be passed as Arrow IPC buffers to avoid transferring it element by element.
+
+        When folds is positive, each alpha is also scored by its MSE averaged over the specified number
+        of random splits, which are made like in DataConveyor.split_samples with the given proportion of training data.
+        """
+
+        alphas_arr = np.array(tuple(alphas), dtype=np.float64)
+        folds = int(folds)
+
+        if alphas_arr.ndim != 1 or not (0 < len(alphas_arr) <= config.MAX_RIDGE_ALPHAS):
+            raise ValueError(
+                f"between 1 and {config.MAX_RIDGE_ALPHAS} alphas should be specified"
+            )
+        elif not np.all(alphas_arr > config.PRECISION):
+            raise ValueError(f"alphas must be greater than {config.PRECISION}")
+        elif not (0 <= folds <= config.MAX_RIDGE_FOLDS):
+            raise ValueError(
+                f"folds should be in the range [0; {config.MAX_RIDGE_FOLDS}]"
+            )
+        elif folds > 0 and not (0 < proportion < 1):
+            raise ValueError("proportion should be in the range (0.0; 1.0)")
+
+        x, y = transfer.localized(x), transfer.localized(y)
+        columns = getattr(x, "columns", None)
+        x_arr = np.array(x, dtype=np.float64)
+        y_arr = np.array(y, dtype=np.float64)
+
+        if x_arr.ndim != 2:
+            raise ValueError("x should be a 2-dimensional matrix")
+        elif y_arr.ndim not in (1, 2):
+            raise ValueError("y should be an array or a 2-dimensional matrix")
+        elif len(x_arr) != len(y_arr):
+            raise ValueError("x and y should contain the same number of samples")
+        elif len(x_arr) == 0:
+            raise ValueError("x and y should contain at least one sample")
+        elif folds > 0 and len(x_arr) < 2:
+            raise ValueError("at least 2 samples are required for cross-validation")
+
+        target_1d = y_arr.ndim == 1
+        if target_1d:
+            y_arr = y_arr[:, np.newaxis]
+
+        coefs, intercepts = ModelConveyor.__ridge_path(x_arr, y_arr, alphas_arr)
+
+        cv_errors = None
+        if folds > 0:
+            errors = np.zeros(len(alphas_arr))
+            for _ in range(folds):
+                train, test = train_test_split(
+                    np.arange(len(x_arr)), train_size=proportion, random_state=self.rng
+                )
+                fold_coefs, fold_intercepts = ModelConveyor.__ridge_path(
+                    x_arr[train], y_arr[train], alphas_arr
+                )
+                predictions = (
+                    np.einsum("sf,aft->ast", x_arr[test], fold_coefs)
+                    + fold_intercepts[:, np.newaxis, :]
+                )
+                errors += np.mean((predictions - y_arr[test]) ** 2, axis=(1, 2))
+
+            cv_errors = tuple((errors / folds).tolist())
+
+        # Transposed to the (targets, features) layout of coef_, like in IncrementalRegression.finalize.
+        coefs = coefs[:, :, 0] if target_1d else coefs.transpose(0, 2, 1)
+        intercepts = intercepts[:, 0] if target_1d else intercepts
+
+        return RidgePath(
+            alphas=tuple(alphas_arr.tolist()),
+            coefs=ModelConveyor.__as_tuples(coefs),
+            intercepts=ModelConveyor.__as_tuples(intercepts),
+            cv_errors=cv_errors,
+            feature_names=(
+                None
+                if columns is None
+                else np.array(list(map(str, columns)), dtype=object)
+            ),
+        )
+
+    def incremental_linear_regression(self) -> IncrementalLinearRegression:
+        """
+        Initialize a basic linear regression model which can be fitted chunk by chunk using partial_fit,
+        allowing to train on datasets which are too large to be passed at once.
+        Call finalize after the last chunk to get the same model as fit_linear_regression returns.
+        """
+
+        return IncrementalLinearRegression()
+
+    def incremental_ridge(self, alpha: float = 1.0) -> IncrementalRidgeRegression:
+        """
+        Initialize a Ridge regression model with the specified alpha which can be fitted chunk by chunk using partial_fit,
+        allowing to train on datasets which are too large to be passed at once.
+        Call finalize after the last chunk to get the same model as fit_ridge returns.
+        """
+
+        if alpha <= config.PRECISION:
+            raise ValueError(f"alpha must be greater than {config.PRECISION}")
+
+        return IncrementalRidgeRegression(alpha=alpha, random_state=self.rng)
 
     def mean_absolute_error(
-        self, y_true: npt.ArrayLike, y_pred: npt.ArrayLike
+        self, y_true: npt.ArrayLike | bytes, y_pred: npt.ArrayLike | bytes
+    ) -> float:
+        """
+        Calculates the MAE for regression prediction results, which can be passed as Arrow IPC buffers.
+        """
+
+        return float(
+            metrics.mean_absolute_error(
+                transfer.localized(y_true), transfer.localized(y_pred)
+            )
+        )
+
+    def mean_squared_error(
+        self, y_true: npt.ArrayLike | bytes, y_pred: npt.ArrayLike | bytes
+    ) -> float:
+        """
+        Calculates the MSE for regression prediction results, which can be passed as Arrow IPC buffers.
+        """
+
+        return float(
+            metrics.mean_squared_error(
+                transfer.localized(y_true), transfer.localized(y_pred)
+            )
+        )
+
+    def predict_dataset(
+        self,
+        model_name: str,
+        dataset_name: str,
+        features: Optional[Sequence[str]] = None,
+    ) -> bytes:
+        """
+        Predict using the saved model on the saved dataset entirely on the server,
+        returning the predictions as an Arrow IPC stream buffer.
+        Features default to the ones the model has been fitted on, if it has been fitted on a dataframe.
+        This call requires authentication.
+        """
+
+        model, x, _ = self.__load_saved(model_name, dataset_name, features)
+        return transfer.encode(model.predict(x))
+
+    def dataset_mean_absolute_error(
+        self,
+        model_name: str,
+        dataset_name: str,
+        target: str | Sequence[str],
+        features: Optional[Sequence[str]] = None,
     ) -> float:
         """
-        Calculates the MAE for regression prediction results.
+        Calculates the MAE of the saved model's predictions for the target columns of the saved dataset in a single call.
+        Features are selected like in predict_dataset.
+        This call requires authentication.
         """
 
-        return float(metrics.mean_absolute_error(y_true, y_pred))
+        model, x, y = self.__load_saved(model_name, dataset_name, features, target)
+        return float(metrics.mean_absolute_error(y, model.predict(x)))
 
-    def mean_squared_error(self, y_true: npt.ArrayLike, y_pred: npt.ArrayLike) -> float:
+    def dataset_mean_squared_error(
+        self,
+        model_name: str,
+        dataset_name: str,
+        target: str | Sequence[str],
+        features: Optional[Sequence[str]] = None,
+    ) -> float:
         """
-        Calculates the MSE for regression prediction results.
+        Calculates the MSE of the saved model's predictions for the target columns of the saved dataset in a single call.
+        Features are selected like in predict_dataset.
+        This call requires authentication.
         """
 
-        return float(metrics.mean_squared_error(y_true, y_pred))
+        model, x, y = self.__load_saved(model_name, dataset_name, features, target)
+        return float(metrics.mean_squared_error(y, model.predict(x)))
+
+    def __load_saved(
+        self,
+        model_name: str,
+        dataset_name: str,
+        features: Optional[Sequence[str]],
+        target: Optional[str | Sequence[str]] = None,
+    ) -> tuple[Model, npt.ArrayLike, Optional[pd.Series | pd.DataFrame]]:
+        if self.load_model is None or self.load_dataset is None:
+            raise RuntimeError("saved models and datasets are unavailable")
+
+        model = self.load_model(model_name)
+        df = self.load_dataset(dataset_name)
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        if features is None and feature_names is None:
+            raise ValueError(
+                "features should be specified for models fitted without feature names"
+            )
+
+        columns = [str(f) for f in (feature_names if features is None else features)]
+        missing = [c for c in columns if c not in df.columns]
+        if len(missing) > 0:
+            raise KeyError(f"dataset has no columns {missing}")
+
+        # Models fitted on arrays warn about being passed a dataframe.
+        x = df[columns] if feature_names is not None else df[columns].to_numpy()
+
+        if target is None:
+            return model, x, None
+        elif isinstance(target, str):
+            return model, x, df[str(target)]
+
+        return model, x, df[[str(t) for t in target]]
+
+    @staticmethod
+    def __ridge_path(
+        x: np.ndarray, y: np.ndarray, alphas: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (alphas, features, targets) coefficients and (alphas, targets) intercepts.
+        """
+
+        x_mean = x.mean(axis=0)
+        y_mean = y.mean(axis=0)
+        u, singular, vt = np.linalg.svd(x - x_mean, full_matrices=False)
+
+        # Ridge solution is V diag(s / (s^2 + alpha)) U^T y, with the last product shared by all alphas.
+        uty = u.T @ (y - y_mean)
+        shrinkage = singular / (singular**2 + alphas[:, np.newaxis])
+        coefs = np.einsum("fk,ak,kt->aft", vt.T, shrinkage, uty)
+        intercepts = y_mean - np.einsum("f,aft->at", x_mean, coefs)
+
+        return coefs, intercepts
+
+    @staticmethod
+    def __as_tuples(array: np.ndarray) -> tuple:
+        if array.ndim == 1:
+            return tuple(array.tolist())
+
+        return tuple(ModelConveyor.__as_tuples(a) for a in array)
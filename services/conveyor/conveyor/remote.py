@@ -2,6 +2,8 @@ from typing import TypeVar, cast
 
 from rpyc.core.protocol import DEFAULT_CONFIG
 
+from . import instrumentation
+
 T = TypeVar("T")
 safe_attrs = cast(set[str], DEFAULT_CONFIG.get("safe_attrs"))
 
@@ -10,10 +12,18 @@ def safe(attrs: set[str]):
     """
     Alternative to rpyc.exposed/rpyc.service combination,
     which works based on _rpyc_getattr instead of the exposed_ prefix.
+    Exposed methods are wrapped for recording their calls when instrumentation is enabled.
     """
 
     def getter(self, name):
-        if name in attrs or name in safe_attrs:
+        if name in attrs:
+            value = getattr(self, name)
+            if instrumentation.registry is not None and callable(value):
+                return instrumentation.instrumented(
+                    f"{type(self).__name__}.{name}", value
+                )
+            return value
+        elif name in safe_attrs:
             return getattr(self, name)
         raise AttributeError("access denied")
 
@@ -0,0 +1,73 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from rpyc.utils.server import Server, ThreadedServer
+
+
+class WorkerPoolServer(Server):
+    """
+    Alternative to rpyc.ThreadedServer which serves each connection using one of a bounded number of worker threads.
+
+    Up to max_queued accepted connections wait for a free worker,
+    after which new connections are no longer accepted and stay in the listen backlog.
+    """
+
+    def __init__(self, *args, max_workers: int, max_queued: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="conveyor-worker"
+        )
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def close(self):
+        super().close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _accept_method(self, sock):
+        while not self.slots.acquire(timeout=0.5):
+            if not self.active:
+                sock.close()
+                self.clients.discard(sock)
+                return
+
+        self.executor.submit(self.__serve, sock)
+
+    def __serve(self, sock):
+        try:
+            self._authenticate_and_serve_client(sock)
+        except Exception:
+            pass  # already logged by _authenticate_and_serve_client
+        finally:
+            self.slots.release()
+
+
+class ReusePortMixin:
+    """
+    Server mixin which binds the listener with SO_REUSEPORT,
+    allowing multiple worker processes to listen on the same port,
+    with the kernel balancing incoming connections between them.
+    """
+
+    def __init__(self, *args, port: int, hostname: Optional[str] = None, **kwargs):
+        # The base server binds its listener right away, before any options can be set,
+        # so it is bound to an ephemeral port first and then replaced.
+        super().__init__(*args, port=0, hostname=hostname, **kwargs)
+
+        timeout = self.listener.gettimeout()
+        self.listener.close()
+
+        self.listener = socket.create_server(
+            (hostname or "", port), backlog=self.backlog, reuse_port=True
+        )
+        self.listener.settimeout(timeout)
+        self.host, self.port = self.listener.getsockname()[:2]
+
+
+class ReusePortThreadedServer(ReusePortMixin, ThreadedServer):
+    pass
+
+
+class ReusePortWorkerPoolServer(ReusePortMixin, WorkerPoolServer):
+    pass
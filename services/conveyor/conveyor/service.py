@@ -1,7 +1,10 @@
+import copy
+import itertools
 import secrets
 from base64 import b85decode, b85encode
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import Optional, cast
+from typing import Callable, Iterable, Optional, TypeVar, cast
 from uuid import UUID, uuid4
 
 import numpy as np
@@ -11,7 +14,7 @@ import rpyc
 import structlog
 from pyarrow import feather
 
-from . import config, remote, storage
+from . import cache, config, remote, storage, transfer
 from .data import DataConveyor, DataFrame
 from .model import Model, ModelConveyor
 
@@ -19,6 +22,9 @@ UNEXPECTED_ERROR = Exception("unexpected error has occurred, please retry later"
 UNAUTHENTICATED_ERROR = Exception("authentication required")
 INVALID_ACCESS_KEY_ERROR = ValueError("invalid access key provided")
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 @remote.safe({"name", "description"})
 @dataclass
@@ -39,24 +45,45 @@ class DataSet:
         "create_account",
         "authenticate",
         "save_dataset",
+        "save_dataset_arrow",
+        "save_datasets",
+        "save_datasets_arrow",
         "list_datasets",
         "load_dataset",
+        "load_dataset_arrow",
+        "load_datasets",
+        "load_datasets_arrow",
         "save_model",
         "list_models",
         "load_model",
     }
 )
 class GoldConveyorService(rpyc.Service):
-    def __init__(self, repository: storage.RedisRepository, files: storage.FileStorage):
+    def __init__(
+        self,
+        repository: storage.RedisRepository,
+        files: storage.FileStorage,
+        batch_samples: bool = False,
+        dataset_cache: Optional[cache.LRUCache[transfer.MappedTable]] = None,
+        model_cache: Optional[cache.LRUCache[Model]] = None,
+        io_executor: Optional[Executor] = None,
+    ):
         self.repository = repository
         self.files = files
+        self.dataset_cache = dataset_cache
+        self.model_cache = model_cache
+        # Shared between connections for overlapping file I/O of the batch calls,
+        # which is done sequentially when it's not set.
+        self.io_executor = io_executor
         self.logger = structlog.stdlib.get_logger("gold-conveyor")
         self.rng = np.random.RandomState(secrets.randbits(30))
 
         # Attributes exposed by the service
         self.account_id: Optional[UUID] = None  # set when client has authenticated
-        self.data_conveyor = DataConveyor(self.rng)
-        self.model_conveyor = ModelConveyor(self.rng)
+        self.data_conveyor = DataConveyor(self.rng, batched=batch_samples)
+        self.model_conveyor = ModelConveyor(
+            self.rng, load_model=self.load_model, load_dataset=self.load_dataset
+        )
 
     def on_connect(self, conn: rpyc.Connection):
         endpoints = cast(
@@ -138,49 +165,172 @@ class GoldConveyorService(rpyc.Service):
         This call requires authentication.
         """
 
+        [(df, name, description)] = self.__dataset_entries([(df, name, description)])
+        self.__save_dataset_tables(
+            [(lambda: pyarrow.Table.from_pandas(df), name, description)]
+        )
+
+    def save_dataset_arrow(self, buffer: bytes, name: str, description: str):
+        """
+        Save dataframe passed as an Arrow IPC stream or file (Feather V2) buffer as dataset with specified name.
+        Unlike save_dataset, the data is transferred in a single round trip.
+        This call requires authentication.
+        """
+
+        [(buffer, name, description)] = self.__dataset_entries(
+            [(buffer, name, description)]
+        )
+
+        # Decoded before saving so that invalid buffers are reported to the client.
+        table = transfer.decode_table(buffer)
+
+        self.__save_dataset_tables([(lambda: table, name, description)])
+
+    def save_datasets(self, datasets: Iterable[tuple[pd.DataFrame, str, str]]):
+        """
+        Save multiple dataframes as datasets, each specified as a (dataframe, name, description) tuple.
+        The dataset files are written concurrently, and their entries are saved at once.
+        This call requires authentication.
+        """
+
+        self.__save_dataset_tables(
+            [
+                (lambda df=df: pyarrow.Table.from_pandas(df), name, description)
+                for df, name, description in self.__dataset_entries(datasets)
+            ]
+        )
+
+    def save_datasets_arrow(self, datasets: Iterable[tuple[bytes, str, str]]):
+        """
+        Save multiple dataframes passed as Arrow IPC stream or file (Feather V2) buffers as datasets,
+        each specified as a (buffer, name, description) tuple, like save_datasets.
+        This call requires authentication.
+        """
+
+        tables = [
+            (transfer.decode_table(buffer), name, description)
+            for buffer, name, description in self.__dataset_entries(datasets)
+        ]
+
+        self.__save_dataset_tables(
+            [
+                (lambda table=table: table, name, description)
+                for table, name, description in tables
+            ]
+        )
+
+    def __dataset_entries(
+        self, datasets: Iterable[tuple[T, str, str]]
+    ) -> list[tuple[T, str, str]]:
+        """
+        Materialize the (data, name, description) tuples of the datasets to save,
+        validating their number, names and descriptions before any of the data is decoded or converted.
+        """
+
         if self.account_id is None:
             raise UNAUTHENTICATED_ERROR
-        elif len(name.encode()) > config.MAX_DATA_LEN:
-            raise ValueError(
-                f"dataset name should not be longer than {config.MAX_DATA_LEN} bytes"
-            )
-        elif len(description.encode()) > config.MAX_DATA_LEN:
+
+        # No more than one extra tuple is read, so that an endless remote iterable is rejected as well.
+        entries = list(itertools.islice(datasets, config.MAX_BATCH_DATASETS + 1))
+        if len(entries) > config.MAX_BATCH_DATASETS:
             raise ValueError(
-                f"dataset description should not be longer than {config.MAX_DATA_LEN} bytes"
+                f"no more than {config.MAX_BATCH_DATASETS} datasets should be saved at once"
             )
 
-        name = str(name)
-        description = str(description)
-        file_id = uuid4()
+        result = []
+        for data, name, description in entries:
+            name, description = str(name), str(description)
+            if len(name.encode()) > config.MAX_DATA_LEN:
+                raise ValueError(
+                    f"dataset name should not be longer than {config.MAX_DATA_LEN} bytes"
+                )
+            elif len(description.encode()) > config.MAX_DATA_LEN:
+                raise ValueError(
+                    f"dataset description should not be longer than {config.MAX_DATA_LEN} bytes"
+                )
+
+            result.append((data, name, description))
+
+        if len(set(name for _, name, _ in result)) < len(result):
+            raise ValueError("dataset names should be unique")
+
+        return result
+
+    def __save_dataset_tables(
+        self, entries: list[tuple[Callable[[], pyarrow.Table], str, str]]
+    ):
+        datasets = [
+            storage.DataSet(name=name, description=description, file_id=uuid4())
+            for _, name, description in entries
+        ]
+
+        # Tables are built in the calling thread, since they can be backed by the client's dataframes,
+        # while writing them to files is done concurrently.
+        tables = []
+        for dataset, (table, _, _) in zip(datasets, entries):
+            try:
+                tables.append(table())
+            except Exception as err:
+                self.logger.error(
+                    "unexpectedly failed to convert dataframe to arrow table",
+                    file_id=str(dataset.file_id),
+                    error=str(err),
+                    stack_info=True,
+                )
+                raise UNEXPECTED_ERROR
+
+        self.__map_io(
+            lambda item: self.__write_dataset_table(*item), list(zip(datasets, tables))
+        )
 
+        # Entries can reference the files only once they're stored.
         try:
-            with self.files.open_write(file_id) as f:
-                feather.write_feather(pyarrow.Table.from_pandas(df), f)
+            self.files.sync(dataset.file_id for dataset in datasets)
         except Exception as err:
             self.logger.error(
-                "unexpectedly failed to save dataframe to file",
-                file_id=str(file_id),
+                "unexpectedly failed to store dataframe files",
+                file_ids=[str(dataset.file_id) for dataset in datasets],
                 error=str(err),
                 stack_info=True,
             )
             raise UNEXPECTED_ERROR
 
         try:
-            self.repository.save_dataset(
-                self.account_id,
-                storage.DataSet(name=name, description=description, file_id=file_id),
-            )
+            self.repository.save_datasets(self.account_id, datasets)
         except Exception as err:
             self.logger.error(
                 "unexpectedly failed to save dataset info to repository",
-                file_id=str(file_id),
-                name=name,
+                file_ids=[str(dataset.file_id) for dataset in datasets],
+                names=[dataset.name for dataset in datasets],
                 error=str(err),
                 stack_info=True,
             )
             raise UNEXPECTED_ERROR
 
-        self.logger.info("saved new dataset", file_id=str(file_id), name=name)
+        for dataset in datasets:
+            self.logger.info(
+                "saved new dataset", file_id=str(dataset.file_id), name=dataset.name
+            )
+
+    def __write_dataset_table(self, dataset: storage.DataSet, table: pyarrow.Table):
+        try:
+            # Written uncompressed as a single record batch, so that loading it can be done zero-copy.
+            arrow_table = table.combine_chunks()
+            with self.files.open_write(dataset.file_id) as f:
+                feather.write_feather(
+                    arrow_table,
+                    f,
+                    compression="uncompressed",
+                    chunksize=max(arrow_table.num_rows, 1),
+                )
+        except Exception as err:
+            self.logger.error(
+                "unexpectedly failed to save dataframe to file",
+                file_id=str(dataset.file_id),
+                error=str(err),
+                stack_info=True,
+            )
+            raise UNEXPECTED_ERROR
 
     def list_datasets(self) -> list[DataSet]:
         """
@@ -209,6 +359,52 @@ class GoldConveyorService(rpyc.Service):
         This call requires authentication.
         """
 
+        return self.__dataset_frame(self.__load_mapped_dataset(name))
+
+    def load_dataset_arrow(self, name: str) -> bytes:
+        """
+        Load dataframe from dataset with the specified name as an Arrow IPC stream buffer.
+        Unlike load_dataset, the data is transferred in a single round trip.
+        This call requires authentication.
+        """
+
+        return transfer.encode_table(self.__load_mapped_dataset(name).table)
+
+    def load_datasets(self, names: Iterable[str]) -> tuple[DataFrame, ...]:
+        """
+        Load dataframes from datasets with the specified names.
+        The dataset entries are fetched at once, and their files are read concurrently.
+        This call requires authentication.
+        """
+
+        return tuple(map(self.__dataset_frame, self.__load_mapped_datasets(names)))
+
+    def load_datasets_arrow(self, names: Iterable[str]) -> tuple[bytes, ...]:
+        """
+        Load dataframes from datasets with the specified names as Arrow IPC stream buffers, like load_datasets.
+        This call requires authentication.
+        """
+
+        return tuple(
+            transfer.encode_table(dataset.table)
+            for dataset in self.__load_mapped_datasets(names)
+        )
+
+    def __dataset_frame(self, dataset: transfer.MappedTable) -> DataFrame:
+        try:
+            df = dataset.to_pandas()
+        except Exception as err:
+            self.logger.error(
+                "unexpectedly failed to map dataframe from file",
+                path=dataset.path,
+                error=str(err),
+                stack_info=True,
+            )
+            raise UNEXPECTED_ERROR
+
+        return DataFrame(df)
+
+    def __load_mapped_dataset(self, name: str) -> transfer.MappedTable:
         if self.account_id is None:
             raise UNAUTHENTICATED_ERROR
 
@@ -227,9 +423,45 @@ class GoldConveyorService(rpyc.Service):
         if dataset is None:
             raise KeyError("no dataset with such name exists")
 
+        return self.__map_dataset(dataset)
+
+    def __load_mapped_datasets(
+        self, names: Iterable[str]
+    ) -> list[transfer.MappedTable]:
+        if self.account_id is None:
+            raise UNAUTHENTICATED_ERROR
+
+        names = [str(name) for name in names]
+        if len(names) > config.MAX_BATCH_DATASETS:
+            raise ValueError(
+                f"no more than {config.MAX_BATCH_DATASETS} datasets should be loaded at once"
+            )
+
+        try:
+            datasets = self.repository.get_datasets(self.account_id, names)
+        except Exception as err:
+            self.logger.error(
+                "unexpectedly failed to get datasets from repository",
+                error=str(err),
+                stack_info=True,
+            )
+            raise UNEXPECTED_ERROR
+
+        found = [dataset for dataset in datasets if dataset is not None]
+        if len(found) < len(datasets):
+            raise KeyError("no dataset with such name exists")
+
+        return self.__map_io(self.__map_dataset, found)
+
+    def __map_dataset(self, dataset: storage.DataSet) -> transfer.MappedTable:
+        # Stored files are never modified, so they can be cached by their IDs.
+        if self.dataset_cache is not None:
+            mapped = self.dataset_cache.get(dataset.file_id)
+            if mapped is not None:
+                return mapped
+
         try:
-            with self.files.open_read(dataset.file_id) as f:
-                df = pd.read_feather(f)
+            mapped = transfer.MappedTable(str(self.files.path(dataset.file_id)))
         except Exception as err:
             self.logger.error(
                 "unexpectedly failed to read dataframe from file",
@@ -240,7 +472,16 @@ class GoldConveyorService(rpyc.Service):
             )
             raise UNEXPECTED_ERROR
 
-        return DataFrame(df)
+        if self.dataset_cache is not None:
+            self.dataset_cache.put(dataset.file_id, mapped, mapped.nbytes)
+
+        return mapped
+
+    def __map_io(self, func: Callable[[T], R], items: list[T]) -> list[R]:
+        if self.io_executor is None or len(items) <= 1:
+            return list(map(func, items))
+
+        return list(self.io_executor.map(func, items))
 
     def save_model(self, model: Model, name: str, description: str):
         """
@@ -269,6 +510,9 @@ class GoldConveyorService(rpyc.Service):
         try:
             with self.files.open_write(file_id) as f:
                 model.save(f)
+
+            # The entry can reference the file only once it's stored.
+            self.files.sync([file_id])
         except Exception as err:
             self.logger.error(
                 "unexpectedly failed to save model to file",
@@ -339,6 +583,16 @@ class GoldConveyorService(rpyc.Service):
         if model_info is None:
             raise KeyError("no model with such name exists")
 
+        # Stored files are never modified, so they can be cached by their IDs.
+        # Copies are returned since save_model modifies the name and description of the passed model.
+        if self.model_cache is not None:
+            model = self.model_cache.get(model_info.file_id)
+            if model is not None:
+                self.logger.debug(
+                    "loaded cached model", file_id=str(model_info.file_id)
+                )
+                return copy.copy(model)
+
         try:
             with self.files.open_read(model_info.file_id) as f:
                 model = Model.load(f)
@@ -352,6 +606,12 @@ class GoldConveyorService(rpyc.Service):
             )
             raise UNEXPECTED_ERROR
 
+        if self.model_cache is not None:
+            self.model_cache.put(model_info.file_id, model, model.nbytes)
+            self.logger.debug("cached loaded model", file_id=str(model_info.file_id))
+
+            return copy.copy(model)
+
         return model
 
     def __logger_with_account_id(self):
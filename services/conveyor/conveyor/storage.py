@@ -1,7 +1,15 @@
+import fcntl
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, cast
-from uuid import UUID
+from typing import Any, Iterable, Iterator, Optional, cast
+from uuid import UUID, uuid4
 
 import redis
 
@@ -19,17 +27,156 @@ class Model:
     file_id: UUID
 
 
+@dataclass
+class StoredFile:
+    file_id: UUID
+    size: int
+    modified_at: float
+
+
+@dataclass
+class RepositoryStats:
+    pool_size: int
+    pool_acquires: int
+    pool_wait_seconds: float
+    pool_max_wait_seconds: float
+    cache_entries: int
+    cache_hits: int
+    cache_misses: int
+
+    @property
+    def cache_hit_rate(self) -> float:
+        requests = self.cache_hits + self.cache_misses
+        return self.cache_hits / requests if requests > 0 else 0.0
+
+
+class ConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking connection pool which tracks how long callers wait for a free connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.acquires = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return super().get_connection(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - start
+            with self.stats_lock:
+                self.acquires += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+
+class ListingCache:
+    """
+    Thread-safe LRU cache for per-account listings, with entries expiring along with their redis keys.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[float, list[Any]]] = OrderedDict()
+        # Incremented on every invalidation, so that listings which were read
+        # concurrently with an invalidation aren't cached with stale data.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> tuple[Optional[list[Any]], int]:
+        """
+        Returns the cached listing or None, along with the generation
+        which should be passed to put after reading the listing from redis.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1]), self.generation
+            elif entry is not None:
+                del self.entries[key]
+
+            self.misses += 1
+            return None, self.generation
+
+    def put(self, key: str, listing: list[Any], ttl_ms: int, generation: int):
+        # Keys without expiration (-1) aren't created by the repository, and missing keys (-2) don't need caching.
+        if self.max_entries <= 0 or ttl_ms <= 0:
+            return
+
+        with self.lock:
+            if generation != self.generation:
+                return
+
+            self.entries[key] = (time.monotonic() + ttl_ms / 1000, list(listing))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(key, None)
+
+
 class RedisRepository:
-    def __init__(self, redis_url: str, ttl_seconds: int):
+    def __init__(
+        self,
+        redis_url: str,
+        ttl_seconds: int,
+        pool_size: int = 64,
+        listing_cache_size: int = 4096,
+    ):
         self.ttl = ttl_seconds
-        self.redis = cast(
-            redis.Redis,
-            redis.Redis.from_url(redis_url, protocol=3, decode_responses=True),
+        self.pool = cast(
+            ConnectionPool,
+            ConnectionPool.from_url(
+                redis_url,
+                max_connections=pool_size,
+                protocol=3,
+                decode_responses=True,
+            ),
         )
+        self.redis = redis.Redis(connection_pool=self.pool)
+        self.listing_cache = ListingCache(listing_cache_size)
         self.redis.ping()
 
     def close(self):
         self.redis.close()
+        self.pool.disconnect()
+
+    def stats(self) -> RepositoryStats:
+        """
+        Returns connection pool and listing cache usage statistics.
+        """
+
+        with self.pool.stats_lock:
+            acquires = self.pool.acquires
+            wait_seconds = self.pool.wait_seconds
+            max_wait_seconds = self.pool.max_wait_seconds
+
+        with self.listing_cache.lock:
+            cache_entries = len(self.listing_cache.entries)
+            cache_hits = self.listing_cache.hits
+            cache_misses = self.listing_cache.misses
+
+        return RepositoryStats(
+            pool_size=self.pool.max_connections,
+            pool_acquires=acquires,
+            pool_wait_seconds=wait_seconds,
+            pool_max_wait_seconds=max_wait_seconds,
+            cache_entries=cache_entries,
+            cache_hits=cache_hits,
+            cache_misses=cache_misses,
+        )
 
     def save_account_creds(self, account_id: UUID, access_key: bytes) -> bool:
         """
@@ -74,21 +221,51 @@ class RedisRepository:
         pl.expire(key, self.ttl)
         pl.execute()
 
+        self.listing_cache.invalidate(key)
+
+    def save_datasets(self, account_id: UUID, datasets: list[DataSet]):
+        """
+        Saves multiple dataset entries for the specified account in a single round trip.
+        """
+
+        if not datasets:
+            return
+
+        key = RedisRepository.__datasets_key(account_id)
+
+        pl = self.redis.pipeline(transaction=True)
+        pl.hset(
+            key,
+            mapping={
+                dataset.name: RedisRepository.__encode_dataset(dataset)
+                for dataset in datasets
+            },
+        )
+        pl.expire(key, self.ttl)
+        pl.execute()
+
+        self.listing_cache.invalidate(key)
+
     def list_datasets(self, account_id: UUID) -> list[DataSet]:
         """
         List datasets saved for the specified account.
         """
 
-        result = cast(
-            dict[str, str],
-            self.redis.hgetall(RedisRepository.__datasets_key(account_id)),
-        )
+        key = RedisRepository.__datasets_key(account_id)
 
-        return [
+        cached, generation = self.listing_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result, ttl_ms = self.__hgetall_with_ttl(key)
+        datasets = [
             RedisRepository.__decode_dataset(name, value)
             for name, value in result.items()
         ]
 
+        self.listing_cache.put(key, datasets, ttl_ms, generation)
+        return datasets
+
     def get_dataset(self, account_id: UUID, name: str) -> Optional[DataSet]:
         """
         Returns the dataset entry saved for the specified account with such name, or None.
@@ -103,6 +280,27 @@ class RedisRepository:
 
         return RedisRepository.__decode_dataset(name, result)
 
+    def get_datasets(
+        self, account_id: UUID, names: list[str]
+    ) -> list[Optional[DataSet]]:
+        """
+        Returns the dataset entries saved for the specified account with such names, or None for missing ones,
+        fetched in a single round trip.
+        """
+
+        if not names:
+            return []
+
+        result = cast(
+            list[Optional[str]],
+            self.redis.hmget(RedisRepository.__datasets_key(account_id), names),
+        )
+
+        return [
+            RedisRepository.__decode_dataset(name, value) if value is not None else None
+            for name, value in zip(names, result)
+        ]
+
     def save_model(self, account_id: UUID, model: Model):
         """
         Saves the model entry for the specified account.
@@ -115,16 +313,26 @@ class RedisRepository:
         pl.expire(key, self.ttl)
         pl.execute()
 
+        self.listing_cache.invalidate(key)
+
     def list_models(self, account_id: UUID) -> list[Model]:
         """
         List models saved for the specified account.
         """
 
-        result = cast(
-            dict[str, str], self.redis.hgetall(RedisRepository.__models_key(account_id))
-        )
+        key = RedisRepository.__models_key(account_id)
+
+        cached, generation = self.listing_cache.get(key)
+        if cached is not None:
+            return cached
 
-        return [Model(name=name, file_id=UUID(value)) for name, value in result.items()]
+        result, ttl_ms = self.__hgetall_with_ttl(key)
+        models = [
+            Model(name=name, file_id=UUID(value)) for name, value in result.items()
+        ]
+
+        self.listing_cache.put(key, models, ttl_ms, generation)
+        return models
 
     def get_model(self, account_id: UUID, name: str) -> Optional[Model]:
         """
@@ -140,6 +348,36 @@ class RedisRepository:
 
         return Model(name=name, file_id=UUID(result))
 
+    def referenced_file_ids(self, batch_size: int = 100) -> set[UUID]:
+        """
+        Returns IDs of all files referenced by dataset and model entries which haven't expired yet.
+        Keys are scanned incrementally and their values are fetched in pipelined batches.
+        """
+
+        file_ids: set[UUID] = set()
+
+        for pattern in ("datasets:*", "models:*"):
+            keys = self.redis.scan_iter(match=pattern, count=batch_size)
+            while batch := [key for _, key in zip(range(batch_size), keys)]:
+                pl = self.redis.pipeline(transaction=False)
+                for key in batch:
+                    pl.hvals(key)
+
+                for values in pl.execute():
+                    for value in cast(list[str], values):
+                        # Dataset values also contain the description after the file ID.
+                        file_ids.add(UUID(hex=value.split("\n", maxsplit=1)[0]))
+
+        return file_ids
+
+    def __hgetall_with_ttl(self, key: str) -> tuple[dict[str, str], int]:
+        pl = self.redis.pipeline(transaction=True)
+        pl.hgetall(key)
+        pl.pttl(key)
+        result, ttl_ms = pl.execute()
+
+        return cast(dict[str, str], result), cast(int, ttl_ms)
+
     @staticmethod
     def __credentials_key(key: bytes) -> str:
         return f"credentials:{key.hex()}"
@@ -175,5 +413,489 @@ class FileStorage:
     def open_write(self, file_id: UUID):
         return open(self.__build_path(file_id), "wb")
 
+    def path(self, file_id: UUID) -> Path:
+        """
+        Returns the path to the file, which can be used for memory-mapping it.
+        """
+
+        return self.__build_path(file_id)
+
+    def sync(self, file_ids: Iterable[UUID]):
+        """
+        Blocks until the files written using open_write are stored, so that they can be referenced.
+        Files are stored directly once closed, so there's nothing to wait for.
+        """
+
+    def close(self):
+        """
+        Stores the files which are still being written.
+        """
+
+    def scan(self) -> Iterator[StoredFile]:
+        """
+        Lazily lists the stored files.
+        """
+
+        return FileStorage._scan_dir(self.dir)
+
+    def delete(self, file_id: UUID) -> int:
+        """
+        Removes the file, returning the number of freed bytes.
+        """
+
+        path = self.__build_path(file_id)
+        size = path.stat().st_size
+        path.unlink()
+        return size
+
+    @staticmethod
+    def _scan_dir(dir: Path) -> Iterator[StoredFile]:
+        with os.scandir(dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+
+                try:
+                    file_id = UUID(entry.name)
+                    stat = entry.stat()
+                except (ValueError, FileNotFoundError):
+                    continue  # not a stored file, or removed concurrently
+
+                yield StoredFile(
+                    file_id=file_id, size=stat.st_size, modified_at=stat.st_mtime
+                )
+
     def __build_path(self, file_id: UUID) -> Path:
         return self.dir.joinpath(str(file_id))
+
+
+class ContentAddressedStorage(FileStorage):
+    """
+    File storage which stores each unique payload only once.
+
+    Payloads are stored as objects named by their SHA-256 hash in directories sharded by the hash prefix,
+    while each file ID is a hard link to the corresponding object, sharded by the ID prefix in the same way.
+    The object's link count thus serves as its reference count,
+    and an object is deleted along with the last file ID referencing it.
+
+    The hash is stored in an extended attribute of the shared inode, so that it's known without reading the payload,
+    and commits and deletes are serialized across processes by locking the object's directory.
+    """
+
+    DIGEST_XATTR = "user.conveyor.sha256"
+
+    def __init__(self, dir: Path):
+        super().__init__(dir)
+        self.tmp_dir = dir / "tmp"
+        self.refs_dir = dir / "refs"
+        self.objects_dir = dir / "objects"
+
+        for d in (self.tmp_dir, self.refs_dir, self.objects_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def open_read(self, file_id: UUID):
+        return open(self.__ref_path(file_id), "rb")
+
+    def open_write(self, file_id: UUID) -> "ContentWriter":
+        return ContentWriter(self, file_id, self.tmp_dir / str(uuid4()))
+
+    def path(self, file_id: UUID) -> Path:
+        return self.__ref_path(file_id)
+
+    def scan(self) -> Iterator[StoredFile]:
+        """
+        Lazily lists the stored file IDs.
+        """
+
+        for first in sorted(self.refs_dir.iterdir()):
+            for second in sorted(first.iterdir()):
+                yield from FileStorage._scan_dir(second)
+
+    def delete(self, file_id: UUID) -> int:
+        """
+        Removes the file ID, along with its object if it isn't referenced by any other file ID.
+        Returns the number of freed bytes, which is non-zero only when the object is removed.
+        """
+
+        ref_path = self.__ref_path(file_id)
+        with open(ref_path, "rb") as f:
+            digest = self.__digest(f)
+
+        object_path = self.__object_path(digest)
+        with self.__locked(digest):
+            stat = ref_path.stat()
+            ref_path.unlink()
+
+            # Links: the object itself, this file ID, and possibly others.
+            # The object is compared by inode, since it could have been replaced by another one with the same payload.
+            if stat.st_nlink == 2 and self.__inode(object_path) == stat.st_ino:
+                object_path.unlink()
+            elif stat.st_nlink > 1:
+                return 0
+
+        return stat.st_size
+
+    def references(self, file_id: UUID) -> int:
+        """
+        Returns the number of file IDs referencing the same payload as this one.
+        """
+
+        return self.__ref_path(file_id).stat().st_nlink - 1
+
+    def _commit(self, file_id: UUID, tmp_path: Path, digest: str):
+        object_path = self.__object_path(digest)
+        ref_path = self.__ref_path(file_id)
+        ref_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            self.__set_digest(str(tmp_path), digest)
+
+            with self.__locked(digest):
+                try:
+                    os.link(tmp_path, object_path)
+                except FileExistsError:
+                    # Deduplicated, bump the modification time of the shared inode
+                    # so that age-based cleaners don't remove the newly referenced payload.
+                    os.utime(object_path)
+
+                os.link(object_path, ref_path)
+        finally:
+            tmp_path.unlink()
+
+    def __digest(self, f) -> str:
+        """
+        Returns the hash of the opened file, computing it from the payload only if it wasn't stored on commit,
+        e.g. when the filesystem doesn't support extended attributes.
+        """
+
+        try:
+            return os.getxattr(f.fileno(), self.DIGEST_XATTR).decode()
+        except OSError:
+            pass
+
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+        self.__set_digest(f.fileno(), digest)
+        return digest
+
+    def __set_digest(self, path: str | int, digest: str):
+        try:
+            os.setxattr(path, self.DIGEST_XATTR, digest.encode())
+        except OSError:
+            pass  # extended attributes aren't supported, the hash is computed on delete instead
+
+    @contextmanager
+    def __locked(self, digest: str) -> Iterator[None]:
+        """
+        Exclusively lock the directory of the object, which is shared with the objects of the same hash prefix.
+        """
+
+        dir = self.__object_path(digest).parent
+        dir.mkdir(parents=True, exist_ok=True)
+
+        fd = os.open(dir, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def __inode(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_ino
+        except FileNotFoundError:
+            return None
+
+    def __ref_path(self, file_id: UUID) -> Path:
+        name = str(file_id)
+        return self.refs_dir / name[:2] / name[2:4] / name
+
+    def __object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:4] / digest
+
+
+class ContentWriter:
+    """
+    File-like object returned by ContentAddressedStorage.open_write,
+    which hashes the payload while it is being written to a temporary file,
+    and commits it to the storage once closed without an error.
+    """
+
+    def __init__(self, storage: ContentAddressedStorage, file_id: UUID, tmp_path: Path):
+        self.storage = storage
+        self.file_id = file_id
+        self.tmp_path = tmp_path
+        self.file = open(tmp_path, "wb")
+        self.hash = hashlib.sha256()
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.hash.update(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.file.close()
+        self.storage._commit(self.file_id, self.tmp_path, self.hash.hexdigest())
+
+    def discard(self):
+        if self.closed:
+            return
+
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "ContentWriter":
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+@dataclass
+class PendingFile:
+    file_id: UUID
+    data: bytes
+    written: threading.Event
+    error: Optional[Exception] = None
+
+
+class WriteBehindStorage(FileStorage):
+    """
+    File storage which queues the written files in memory and stores them using the wrapped storage
+    from dedicated writer threads, fsyncing them in batches along with their directories.
+
+    Closing a written file only queues it, so sync must be called before referencing it anywhere,
+    while the queued files are read from memory until they're stored.
+    Closing is blocked while the queued files exceed max_queued_bytes.
+    Payloads of the files which have failed to be stored are dropped right away,
+    and only the errors of the last max_failed_files of them are kept until they're synced.
+    """
+
+    def __init__(
+        self,
+        files: FileStorage,
+        writers: int = 2,
+        max_queued_bytes: int = 64 << 20,
+        max_batch_files: int = 64,
+        max_failed_files: int = 1024,
+    ):
+        self.files = files
+        self.dir = files.dir
+        self.max_queued_bytes = max_queued_bytes
+        self.max_batch_files = max_batch_files
+        self.max_failed_files = max_failed_files
+        self.condition = threading.Condition()
+        self.queue: deque[PendingFile] = deque()
+        # Queued files, including the ones being stored, and the errors of failed files which weren't synced yet.
+        self.pending: dict[UUID, PendingFile] = {}
+        self.failed: OrderedDict[UUID, Exception] = OrderedDict()
+        self.queued_bytes = 0
+        self.closed = False
+
+        self.writers = [
+            threading.Thread(
+                target=self.__write_loop, name=f"write-behind-{i}", daemon=True
+            )
+            for i in range(writers)
+        ]
+        for writer in self.writers:
+            writer.start()
+
+    def open_read(self, file_id: UUID):
+        with self.condition:
+            pending = self.pending.get(file_id)
+
+        if pending is not None:
+            return io.BytesIO(pending.data)
+
+        return self.files.open_read(file_id)
+
+    def open_write(self, file_id: UUID) -> "PendingWriter":
+        return PendingWriter(self, file_id)
+
+    def path(self, file_id: UUID) -> Path:
+        """
+        Returns the path to the file, waiting for it to be stored if it's still queued.
+        """
+
+        with self.condition:
+            pending = self.pending.get(file_id)
+
+        if pending is not None:
+            pending.written.wait()
+
+        return self.files.path(file_id)
+
+    def sync(self, file_ids: Iterable[UUID]):
+        """
+        Blocks until the files written using open_write are durably stored,
+        raising the error of the first file which has failed to be stored.
+        """
+
+        for file_id in file_ids:
+            with self.condition:
+                pending = self.pending.get(file_id)
+
+            if pending is not None:
+                pending.written.wait()
+
+            with self.condition:
+                error = self.failed.pop(file_id, None)
+
+            if error is not None:
+                raise error
+            elif pending is None and not self.files.path(file_id).exists():
+                # Either never written, or its error was evicted.
+                raise FileNotFoundError(f"file {file_id} has not been stored")
+
+    def close(self):
+        """
+        Stores the queued files and stops the writer threads.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        for writer in self.writers:
+            writer.join()
+
+        self.files.close()
+
+    def scan(self) -> Iterator[StoredFile]:
+        return self.files.scan()
+
+    def delete(self, file_id: UUID) -> int:
+        return self.files.delete(file_id)
+
+    def _enqueue(self, file_id: UUID, data: bytes):
+        pending = PendingFile(file_id=file_id, data=data, written=threading.Event())
+
+        with self.condition:
+            # A file larger than the whole budget is queued once the queue is empty, instead of blocking forever.
+            self.condition.wait_for(
+                lambda: self.closed
+                or self.queued_bytes == 0
+                or self.queued_bytes + len(data) <= self.max_queued_bytes
+            )
+            if self.closed:
+                raise ValueError("write-behind storage is closed")
+
+            self.pending[file_id] = pending
+            self.queue.append(pending)
+            self.queued_bytes += len(data)
+            self.condition.notify_all()
+
+    def __write_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or self.closed)
+                if not self.queue:
+                    return
+
+                batch = [
+                    self.queue.popleft()
+                    for _ in range(min(len(self.queue), self.max_batch_files))
+                ]
+
+            self.__write_batch(batch)
+
+            with self.condition:
+                for pending in batch:
+                    del self.pending[pending.file_id]
+                    self.queued_bytes -= len(pending.data)
+                    if pending.error is not None:
+                        pending.data = b""
+                        self.failed[pending.file_id] = pending.error
+                        self.failed.move_to_end(pending.file_id)
+
+                while len(self.failed) > self.max_failed_files:
+                    self.failed.popitem(last=False)
+
+                self.condition.notify_all()
+
+            for pending in batch:
+                pending.written.set()
+
+    def __write_batch(self, batch: list[PendingFile]):
+        dirs: set[Path] = set()
+
+        for pending in batch:
+            try:
+                with self.files.open_write(pending.file_id) as f:
+                    f.write(pending.data)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                dirs.add(self.files.path(pending.file_id).parent)
+            except Exception as err:
+                pending.error = err
+
+        # Directories are fsynced once per batch, making the new directory entries of all its files durable.
+        try:
+            for dir in dirs:
+                fd = os.open(dir, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        except Exception as err:
+            for pending in batch:
+                pending.error = pending.error or err
+
+
+class PendingWriter(io.BytesIO):
+    """
+    File-like object returned by WriteBehindStorage.open_write,
+    which buffers the payload in memory and queues it once closed without an error.
+    """
+
+    def __init__(self, storage: WriteBehindStorage, file_id: UUID):
+        super().__init__()
+        self.storage = storage
+        self.file_id = file_id
+
+    def close(self):
+        if self.closed:
+            return
+
+        data = self.getvalue()
+        super().close()
+        self.storage._enqueue(self.file_id, data)
+
+    def discard(self):
+        super().close()
+
+    def __enter__(self) -> "PendingWriter":
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def __del__(self):
+        # Unlike regular files, writers which weren't closed explicitly are never stored.
+        self.discard()
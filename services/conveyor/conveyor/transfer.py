@@ -0,0 +1,154 @@
+import mmap
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyarrow
+from pyarrow import ipc
+
+from . import config
+
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def encode_table(table: pyarrow.Table) -> bytes:
+    """
+    Serialize arrow table into an Arrow IPC stream buffer.
+    """
+
+    sink = pyarrow.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def decode_table(buffer: bytes) -> pyarrow.Table:
+    """
+    Deserialize arrow table from an Arrow IPC stream or file (Feather V2) buffer.
+    Only actual bytes objects are accepted, since anything else would be a remote reference,
+    which defeats the purpose of passing the data as a single buffer.
+    The size limit applies to the decoded record batches as well, since their bodies can be compressed.
+    """
+
+    if type(buffer) is not bytes:
+        raise TypeError("arrow buffer should be passed as bytes")
+    elif len(buffer) > config.MAX_BUFFER_BYTES:
+        raise ValueError(
+            f"arrow buffer should not be larger than {config.MAX_BUFFER_BYTES} bytes"
+        )
+
+    source = pyarrow.py_buffer(buffer)
+    if buffer.startswith(ARROW_FILE_MAGIC):
+        reader = ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        reader = ipc.open_stream(source)
+        batches = iter(reader)
+
+    decoded = []
+    nbytes = 0
+    for batch in batches:
+        nbytes += batch.nbytes
+        if nbytes > config.MAX_BUFFER_BYTES:
+            raise ValueError(
+                f"decoded arrow data should not be larger than {config.MAX_BUFFER_BYTES} bytes"
+            )
+        decoded.append(batch)
+
+    return pyarrow.Table.from_batches(decoded, schema=reader.schema)
+
+
+def encode(data: pd.DataFrame | np.ndarray) -> bytes:
+    """
+    Serialize dataframe or 1-2 dimensional array into an Arrow IPC stream buffer.
+    Array columns are named by their indices.
+    """
+
+    if isinstance(data, pd.DataFrame):
+        return encode_table(pyarrow.Table.from_pandas(data, preserve_index=False))
+
+    array = np.asarray(data)
+    if array.ndim == 1:
+        array = array[:, np.newaxis]
+
+    return encode_table(
+        pyarrow.table({str(i): array[:, i] for i in range(array.shape[1])})
+    )
+
+
+def decode(buffer: bytes) -> pd.DataFrame:
+    """
+    Deserialize dataframe from an Arrow IPC stream or file (Feather V2) buffer.
+    """
+
+    return decode_table(buffer).to_pandas()
+
+
+def localized(data: npt.ArrayLike | bytes) -> npt.ArrayLike:
+    """
+    Decode data passed as an arrow buffer, leaving other array-likes as-is.
+    """
+
+    if type(data) is bytes:
+        return decode(data)
+
+    return data
+
+
+class MappedTable:
+    """
+    Arrow table memory-mapped from an Arrow IPC file (Feather V2), which can be shared between readers.
+    Columns of uncompressed files written as a single record batch reference the mapped pages instead of copying them.
+    The file is kept open, so the table and its dataframes stay valid even if the path is removed or replaced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.mapping = pyarrow.py_buffer(
+                mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+            self.table = ipc.open_file(self.mapping).read_all()
+        except BaseException:
+            self.file.close()
+            raise
+
+    @property
+    def nbytes(self) -> int:
+        return self.mapping.size
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Convert table to dataframe, which is writable and independent from the table and other converted dataframes.
+        Fixed-width columns aren't copied, and are instead backed by a private copy-on-write mapping of the file.
+        """
+
+        df = self.table.to_pandas(split_blocks=True)
+        if not df.columns.is_unique:
+            return df.copy()
+
+        private = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        columns = {}
+        for name in df.columns:
+            values = df[name].values
+            if not isinstance(values, np.ndarray) or values.flags.writeable:
+                columns[name] = df[name]
+                continue
+
+            # Arrow marks zero-copy arrays as read-only, even though they might be views of the mapped file.
+            offset = values.ctypes.data - self.mapping.address
+            if (
+                values.flags.c_contiguous
+                and 0 <= offset
+                and offset + values.nbytes <= self.mapping.size
+            ):
+                columns[name] = np.frombuffer(
+                    private, dtype=values.dtype, count=values.size, offset=offset
+                )
+            else:
+                columns[name] = values.copy()
+
+        return pd.DataFrame(columns, index=df.index, copy=False)
@@ -1,10 +1,13 @@
 import argparse
 from collections import UserList as ulist
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
 import rpyc
 
-from conveyor import AlloyComposition, GoldConveyorService
+from conveyor import AlloyComposition
+
+if TYPE_CHECKING:
+    from conveyor import GoldConveyorService
 
 
 def main():
@@ -30,7 +33,7 @@ def main():
             include_local_version=False,
         ),
     )
-    service: GoldConveyorService = cast(GoldConveyorService, conn.root)
+    service = cast("GoldConveyorService", conn.root)
 
     # Select samples of different origins and combine them.
     custom_samples = service.data_conveyor.template_alloy_samples(
@@ -1,10 +1,14 @@
 import logging
+import os
 import signal
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
+from typing import Callable, Literal, Optional
 
 import rpyc
 import structlog
@@ -12,17 +16,55 @@ from pydantic import RedisDsn, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from rpyc.utils.helpers import classpartial
 
-from conveyor import GoldConveyorService, storage
+from conveyor import (
+    GoldConveyorService,
+    cache,
+    collector,
+    instrumentation,
+    server,
+    storage,
+)
+
+# Redis connection cap of the threaded server, which doesn't bound the number of its handler threads.
+THREADED_REDIS_POOL_SIZE = 1024
+# Processes exiting sooner than this after their start are restarted with an exponentially growing delay.
+RESTART_MIN_UPTIME_SECONDS = 10.0
+RESTART_BASE_DELAY_SECONDS = 1.0
+RESTART_MAX_DELAY_SECONDS = 60.0
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="conveyor_")
 
     debug: bool = False
+    batch_samples: bool = False
     data_ttl: timedelta
     data_dir: Path
+    content_addressed_storage: bool = False
     listen_port: int
+    server_mode: Literal["threaded", "pool"] = "threaded"
+    workers: int = 1
+    max_workers: int = 64
+    backlog: int = 128
     redis_url: RedisDsn
+    # Defaults to max_workers in the pool mode, and to THREADED_REDIS_POOL_SIZE in the threaded one.
+    # Once all connections are in use, handlers wait up to 20 seconds for a free one before failing.
+    redis_pool_size: Optional[int] = None
+    listing_cache_size: int = 4096
+    dataset_cache_bytes: int = 256 << 20  # 0 disables caching of loaded datasets
+    dataset_cache_entries: int = 1024
+    loaded_model_cache_bytes: int = 64 << 20  # 0 disables caching of loaded models
+    io_threads: int = 4  # 0 disables concurrent file I/O of batch dataset calls
+    write_behind_threads: int = 0  # 0 stores files synchronously in handler threads
+    write_behind_bytes: int = 64 << 20
+    stats_interval: timedelta = timedelta(minutes=1)
+    instrumentation: bool = (
+        False  # per-method call stats, reported along with other stats
+    )
+    gc_interval: Optional[timedelta] = None  # collector is disabled by default
+    gc_grace: timedelta = timedelta(minutes=5)
+    gc_batch_size: int = 500
+    gc_batch_interval: timedelta = timedelta(seconds=1)
 
 
 def main():
@@ -57,25 +99,265 @@ def main():
 
     try:
         repository = storage.RedisRepository(
-            str(settings.redis_url), round(settings.data_ttl.total_seconds())
+            str(settings.redis_url),
+            round(settings.data_ttl.total_seconds()),
+            pool_size=settings.redis_pool_size
+            or (
+                settings.max_workers
+                if settings.server_mode == "pool"
+                else THREADED_REDIS_POOL_SIZE
+            ),
+            # Listings cached by one worker process can't be invalidated by saves in the others.
+            listing_cache_size=(
+                settings.listing_cache_size if settings.workers <= 1 else 0
+            ),
         )
     except Exception as err:
         logger.critical("failed to initialize redis-based repository", error=str(err))
         exit(1)
 
     try:
-        files = storage.FileStorage(settings.data_dir)
+        files = (
+            storage.ContentAddressedStorage(settings.data_dir)
+            if settings.content_addressed_storage
+            else storage.FileStorage(settings.data_dir)
+        )
     except Exception as err:
         logger.critical("failed to initialize file storage", error=str(err))
         exit(1)
 
-    logger.warn("starting conveyor service", port=settings.listen_port)
+    if settings.workers > 1:
+        supervise(settings, logger, repository, files)
+    else:
+        serve(settings, logger, repository, files, worker=False)
+
+
+@dataclass
+class ChildSlot:
+    """
+    Process run by the supervisor, along with the state of its restarts.
+    """
+
+    target: Callable[[], None]
+    started_at: float = 0.0
+    # Number of consecutive exits sooner than RESTART_MIN_UPTIME_SECONDS after the start.
+    failures: int = 0
+    restart_at: Optional[float] = None
+
+
+def supervise(
+    settings: Settings,
+    logger: structlog.stdlib.BoundLogger,
+    repository: storage.RedisRepository,
+    files: storage.FileStorage,
+):
+    """
+    Run the configured number of forked worker processes serving the same port, along with the collector process,
+    restarting them if they exit unexpectedly and shutting them down on exit.
+    The supervisor itself doesn't start any threads, so that the processes are never forked with a lock held by one.
+    """
+
+    logger.warn(
+        "starting conveyor worker processes",
+        port=settings.listen_port,
+        workers=settings.workers,
+    )
+
+    alive = True
+    # Forked process IDs, along with the slots they're run for.
+    children: dict[int, ChildSlot] = {}
+    signals = {signal.SIGTERM, signal.SIGINT}
+
+    def shutdown(*_):
+        nonlocal alive
+        if not alive:
+            return
+
+        alive = False
+        logger.warn("shutting down conveyor worker processes")
+
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for sig in signals:
+        signal.signal(sig, shutdown)
+
+    def spawn(slot: ChildSlot):
+        # Shutdown signals are blocked until the child is registered,
+        # and until the child replaces the handlers inherited from the supervisor.
+        signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                for sig in signals:
+                    signal.signal(sig, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+
+                exit_code = 1
+                try:
+                    slot.target()
+                    exit_code = 0
+                except BaseException as err:
+                    logger.critical(
+                        "conveyor process failed",
+                        pid=os.getpid(),
+                        error=str(err),
+                        stack_info=True,
+                    )
+                finally:
+                    os._exit(exit_code)
+
+            slot.started_at = time.monotonic()
+            children[pid] = slot
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+
+    def worker():
+        serve(
+            settings,
+            logger.bind(worker=os.getpid()),
+            repository,
+            files,
+            worker=True,
+        )
+
+    def collector_process():
+        collecting = True
+
+        def stop(*_):
+            nonlocal collecting
+            collecting = False
+
+        for sig in signals:
+            signal.signal(sig, stop)
+
+        collect(
+            settings,
+            logger.bind(collector=os.getpid()),
+            repository,
+            files,
+            lambda: collecting,
+        )
+        repository.close()
+
+    slots = [ChildSlot(worker) for _ in range(settings.workers)]
+    if settings.gc_interval is not None:
+        slots.append(ChildSlot(collector_process))
+
+    for slot in slots:
+        spawn(slot)
+
+    while True:
+        now = time.monotonic()
+        for slot in slots:
+            if alive and slot.restart_at is not None and slot.restart_at <= now:
+                slot.restart_at = None
+                spawn(slot)
+
+        restarts = [
+            slot.restart_at for slot in slots if alive and slot.restart_at is not None
+        ]
+        if not children and not restarts:
+            break
+
+        # Exited children are polled while restarts are scheduled, since waiting for them can't time out.
+        if restarts:
+            pid, status = os.waitpid(-1, os.WNOHANG) if children else (0, 0)
+            if pid == 0:
+                time.sleep(min(1.0, max(0.0, min(restarts) - time.monotonic())))
+                continue
+        else:
+            pid, status = os.wait()
+
+        slot = children.pop(pid)
+        if not alive:
+            continue
+
+        if time.monotonic() - slot.started_at < RESTART_MIN_UPTIME_SECONDS:
+            slot.failures += 1
+        else:
+            slot.failures = 0
+
+        delay = (
+            min(
+                RESTART_MAX_DELAY_SECONDS,
+                RESTART_BASE_DELAY_SECONDS * 2 ** (slot.failures - 1),
+            )
+            if slot.failures > 0
+            else 0.0
+        )
+        slot.restart_at = time.monotonic() + delay
+
+        logger.error(
+            "conveyor process exited unexpectedly, restarting",
+            pid=pid,
+            exit_code=os.waitstatus_to_exitcode(status),
+            restart_delay_seconds=delay,
+        )
+
+    repository.close()
+
+
+def serve(
+    settings: Settings,
+    logger: structlog.stdlib.BoundLogger,
+    repository: storage.RedisRepository,
+    files: storage.FileStorage,
+    worker: bool,
+):
+    """
+    Run the conveyor server until shutdown.
+    Worker processes share the listening port with each other, and leave garbage collection to the collector process.
+    """
+
+    logger.warn(
+        "starting conveyor service",
+        port=settings.listen_port,
+        mode=settings.server_mode,
+    )
 
     rpyc_logger = structlog.stdlib.get_logger("rpyc")
     rpyc_logger.setLevel(logging.WARN)
 
-    server = rpyc.ThreadedServer(
-        classpartial(GoldConveyorService, repository, files),
+    # Writer threads don't survive forking, so they're started by each serving process.
+    if settings.write_behind_threads > 0:
+        files = storage.WriteBehindStorage(
+            files,
+            writers=settings.write_behind_threads,
+            max_queued_bytes=settings.write_behind_bytes,
+        )
+
+    registry = instrumentation.enable() if settings.instrumentation else None
+    dataset_cache = (
+        cache.LRUCache(
+            settings.dataset_cache_bytes, max_entries=settings.dataset_cache_entries
+        )
+        if settings.dataset_cache_bytes > 0
+        else None
+    )
+    model_cache = (
+        cache.LRUCache(settings.loaded_model_cache_bytes)
+        if settings.loaded_model_cache_bytes > 0
+        else None
+    )
+    io_executor = (
+        ThreadPoolExecutor(settings.io_threads, thread_name_prefix="conveyor-io")
+        if settings.io_threads > 0
+        else None
+    )
+    service = classpartial(
+        GoldConveyorService,
+        repository,
+        files,
+        batch_samples=settings.batch_samples,
+        dataset_cache=dataset_cache,
+        model_cache=model_cache,
+        io_executor=io_executor,
+    )
+    server_options = dict(
         port=settings.listen_port,
         logger=rpyc_logger,
         protocol_config=dict(
@@ -87,6 +369,21 @@ def main():
         ),
     )
 
+    if settings.server_mode == "pool":
+        conveyor_server = (
+            server.ReusePortWorkerPoolServer if worker else server.WorkerPoolServer
+        )(
+            service,
+            max_workers=settings.max_workers,
+            max_queued=settings.backlog,
+            backlog=settings.backlog,
+            **server_options,
+        )
+    else:
+        conveyor_server = (
+            server.ReusePortThreadedServer if worker else rpyc.ThreadedServer
+        )(service, **server_options)
+
     alive = True
 
     def shutdown(*_):
@@ -102,10 +399,133 @@ def main():
 
         logger.warn("shutting down conveyor service")
 
-        server.close()
-        repository.close()
+        conveyor_server.close()
+
+    def stats_reporter():
+        report_at = time.monotonic() + settings.stats_interval.total_seconds()
+
+        while alive:
+            time.sleep(1)
+            if time.monotonic() < report_at:
+                continue
+
+            report_at += settings.stats_interval.total_seconds()
+            stats = repository.stats()
+            logger.info(
+                "repository stats",
+                pool_size=stats.pool_size,
+                pool_acquires=stats.pool_acquires,
+                pool_wait_seconds=stats.pool_wait_seconds,
+                pool_max_wait_seconds=stats.pool_max_wait_seconds,
+                cache_entries=stats.cache_entries,
+                cache_hit_rate=stats.cache_hit_rate,
+            )
+
+            if dataset_cache is not None:
+                dataset_stats = dataset_cache.stats()
+                logger.info(
+                    "dataset cache stats",
+                    entries=dataset_stats.entries,
+                    size_bytes=dataset_stats.size_bytes,
+                    hits=dataset_stats.hits,
+                    misses=dataset_stats.misses,
+                    hit_rate=dataset_stats.hit_rate,
+                )
+
+            if model_cache is not None:
+                model_stats = model_cache.stats()
+                logger.info(
+                    "model cache stats",
+                    entries=model_stats.entries,
+                    size_bytes=model_stats.size_bytes,
+                    hits=model_stats.hits,
+                    misses=model_stats.misses,
+                    hit_rate=model_stats.hit_rate,
+                )
+
+            if registry is not None:
+                for method, method_stats in sorted(registry.drain().items()):
+                    logger.info(
+                        "method call stats",
+                        method=method,
+                        calls=method_stats.calls,
+                        errors=method_stats.errors,
+                        seconds=method_stats.seconds,
+                        p50_seconds_le=method_stats.latency_quantile(0.5),
+                        p99_seconds_le=method_stats.latency_quantile(0.99),
+                        round_trips=method_stats.round_trips,
+                        bytes_received=method_stats.bytes_received,
+                        bytes_sent=method_stats.bytes_sent,
+                    )
 
     shutdown_thread = threading.Thread(target=shutdown_watcher)
     shutdown_thread.start()
 
-    server.start()
+    stats_thread = threading.Thread(target=stats_reporter, daemon=True)
+    stats_thread.start()
+
+    if not worker and settings.gc_interval is not None:
+        collector_thread = threading.Thread(
+            target=collect,
+            args=(settings, logger, repository, files, lambda: alive),
+            daemon=True,
+        )
+        collector_thread.start()
+
+    try:
+        conveyor_server.start()
+    finally:
+        # Worker processes exit right after serving, without running any teardown,
+        # so files are stored and connections are closed before returning.
+        alive = False
+        shutdown_thread.join()
+
+        if io_executor is not None:
+            io_executor.shutdown()
+        files.close()
+        repository.close()
+
+
+def collect(
+    settings: Settings,
+    logger: structlog.stdlib.BoundLogger,
+    repository: storage.RedisRepository,
+    files: storage.FileStorage,
+    active: Callable[[], bool],
+):
+    """
+    Periodically collect unreferenced files while active.
+    """
+
+    garbage_collector = collector.GarbageCollector(
+        repository,
+        files,
+        grace_seconds=settings.gc_grace.total_seconds(),
+        batch_size=settings.gc_batch_size,
+        batch_interval_seconds=settings.gc_batch_interval.total_seconds(),
+    )
+    interval = settings.gc_interval.total_seconds()
+    collect_at = time.monotonic() + interval
+
+    while active():
+        time.sleep(1)
+        if time.monotonic() < collect_at:
+            continue
+
+        try:
+            stats = garbage_collector.collect(active)
+        except Exception as err:
+            logger.error(
+                "unexpectedly failed to collect unreferenced files",
+                error=str(err),
+            )
+        else:
+            logger.info(
+                "collected unreferenced files",
+                scanned_files=stats.scanned_files,
+                deleted_files=stats.deleted_files,
+                reclaimed_bytes=stats.reclaimed_bytes,
+                duration_seconds=stats.duration_seconds,
+            )
+
+        collect_at = time.monotonic() + interval